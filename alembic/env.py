@@ -3,6 +3,7 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from alembic import context
 from app.database import Base
+from app.models import user, chatroom, message, otp, outbox, stripe_event  # noqa: F401
 from app.config import settings
 
 # this is the Alembic Config object
@@ -18,12 +19,25 @@ config.set_main_option("sqlalchemy.url", settings.database_url)
 # add your model's MetaData object here
 target_metadata = Base.metadata
 
+# Full-text search objects live only in migrations (see 0006), so
+# autogenerate must not propose dropping them
+SEARCH_TABLE_PREFIX = "messages_fts"
+SEARCH_OBJECTS = {"search_vector", "ix_messages_search_vector"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and name.startswith(SEARCH_TABLE_PREFIX):
+        return False
+    return name not in SEARCH_OBJECTS
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -41,7 +55,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,89 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+Databases created before migrations existed (via create_all) already have
+these tables and should be marked with `alembic stamp 0001`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("mobile_number", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=True),
+        sa.Column("subscription_tier", sa.Enum("BASIC", "PRO", name="subscriptiontier"), nullable=True),
+        sa.Column("daily_message_count", sa.Integer(), nullable=True),
+        sa.Column("last_message_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("stripe_customer_id", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_mobile_number", "users", ["mobile_number"], unique=True)
+
+    op.create_table(
+        "otps",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("mobile_number", sa.String(), nullable=False),
+        sa.Column("otp_code", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("is_used", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_otps_id", "otps", ["id"])
+
+    op.create_table(
+        "chatrooms",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_chatrooms_id", "chatrooms", ["id"])
+
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("chatroom_id", sa.Integer(), nullable=False),
+        sa.Column("user_message", sa.Text(), nullable=False),
+        sa.Column("gemini_response", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["chatroom_id"], ["chatrooms.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_messages_id", "messages", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_id", table_name="messages")
+    op.drop_table("messages")
+    op.drop_index("ix_chatrooms_id", table_name="chatrooms")
+    op.drop_table("chatrooms")
+    op.drop_index("ix_otps_id", table_name="otps")
+    op.drop_table("otps")
+    op.drop_index("ix_users_mobile_number", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
+    sa.Enum(name="subscriptiontier").drop(op.get_bind(), checkfirst=True)
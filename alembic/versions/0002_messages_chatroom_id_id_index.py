@@ -0,0 +1,25 @@
+"""add (chatroom_id, id) index on messages
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_messages_chatroom_id_id", "messages", ["chatroom_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_chatroom_id_id", table_name="messages")
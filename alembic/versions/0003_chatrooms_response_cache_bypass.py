@@ -0,0 +1,29 @@
+"""add response_cache_bypass to chatrooms
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "chatrooms",
+        sa.Column("response_cache_bypass", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("chatrooms", "response_cache_bypass")
@@ -0,0 +1,25 @@
+"""add (mobile_number, is_used) index on otps
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_otps_mobile_number_is_used", "otps", ["mobile_number", "is_used"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_otps_mobile_number_is_used", table_name="otps")
@@ -0,0 +1,36 @@
+"""add stripe_events and index users.stripe_customer_id
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stripe_events",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_stripe_customer_id", "users", ["stripe_customer_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_stripe_customer_id", table_name="users")
+    op.drop_table("stripe_events")
@@ -0,0 +1,105 @@
+"""add full-text search over messages
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+Postgres: a weighted tsvector column (user_message A, gemini_response B)
+maintained by a trigger, backfilled in batches, with a GIN index built
+after the backfill. SQLite: an FTS5 table over messages maintained by
+triggers.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade_postgresql() -> None:
+    op.execute("ALTER TABLE messages ADD COLUMN search_vector tsvector")
+    op.execute("""
+        CREATE FUNCTION messages_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.user_message, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(NEW.gemini_response, '')), 'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER messages_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF user_message, gemini_response ON messages
+        FOR EACH ROW EXECUTE FUNCTION messages_search_vector_update()
+    """)
+
+    # Existing rows, in id ranges so no single statement rewrites the table
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text("SELECT max(id) FROM messages")).scalar() or 0
+    for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+        bind.execute(sa.text("""
+            UPDATE messages SET search_vector =
+                setweight(to_tsvector('english', coalesce(user_message, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(gemini_response, '')), 'B')
+            WHERE id >= :start AND id < :end
+        """), {"start": start, "end": start + BACKFILL_BATCH_SIZE})
+
+    op.execute("CREATE INDEX ix_messages_search_vector ON messages USING gin (search_vector)")
+
+
+def upgrade_sqlite() -> None:
+    op.execute("""
+        CREATE VIRTUAL TABLE messages_fts USING fts5(
+            user_message, gemini_response, content='messages', content_rowid='id')
+    """)
+    op.execute("""
+        CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, user_message, gemini_response)
+            VALUES (new.id, new.user_message, new.gemini_response);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, user_message, gemini_response)
+            VALUES ('delete', old.id, old.user_message, old.gemini_response);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER messages_fts_update AFTER UPDATE OF user_message, gemini_response ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, user_message, gemini_response)
+            VALUES ('delete', old.id, old.user_message, old.gemini_response);
+            INSERT INTO messages_fts(rowid, user_message, gemini_response)
+            VALUES (new.id, new.user_message, new.gemini_response);
+        END
+    """)
+    op.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        upgrade_postgresql()
+    elif dialect == "sqlite":
+        upgrade_sqlite()
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX ix_messages_search_vector")
+        op.execute("DROP TRIGGER messages_search_vector_trigger ON messages")
+        op.execute("DROP FUNCTION messages_search_vector_update()")
+        op.execute("ALTER TABLE messages DROP COLUMN search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("messages_fts_insert", "messages_fts_delete", "messages_fts_update"):
+            op.execute(f"DROP TRIGGER {trigger}")
+        op.execute("DROP TABLE messages_fts")
@@ -0,0 +1,63 @@
+"""add message stats to chatrooms
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+message_count, last_message_preview and last_activity_at, backfilled
+from messages in batches of chatroom ids, then indexed for the chatroom
+list's keyset pagination (by last activity or by creation).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+PREVIEW_LENGTH = 120
+
+
+def upgrade() -> None:
+    op.add_column("chatrooms", sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("chatrooms", sa.Column("last_message_preview", sa.String(), nullable=True))
+    op.add_column("chatrooms", sa.Column("last_activity_at", sa.DateTime(timezone=True), nullable=True))
+
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text("SELECT max(id) FROM chatrooms")).scalar() or 0
+    for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+        bind.execute(sa.text("""
+            UPDATE chatrooms SET
+                message_count = (SELECT count(*) FROM messages WHERE messages.chatroom_id = chatrooms.id),
+                last_message_preview = (
+                    SELECT substr(coalesce(gemini_response, user_message), 1, :preview_length)
+                    FROM messages WHERE messages.chatroom_id = chatrooms.id
+                    ORDER BY messages.id DESC LIMIT 1),
+                last_activity_at = coalesce(
+                    (SELECT max(created_at) FROM messages WHERE messages.chatroom_id = chatrooms.id),
+                    created_at, CURRENT_TIMESTAMP)
+            WHERE id >= :start AND id < :end
+        """), {"start": start, "end": start + BACKFILL_BATCH_SIZE, "preview_length": PREVIEW_LENGTH})
+
+    with op.batch_alter_table("chatrooms") as batch_op:
+        batch_op.alter_column("last_activity_at", existing_type=sa.DateTime(timezone=True),
+                              nullable=False, server_default=sa.func.now())
+    op.create_index("ix_chatrooms_user_id_last_activity_at", "chatrooms",
+                    ["user_id", "last_activity_at", "id"])
+    op.create_index("ix_chatrooms_user_id_created_at", "chatrooms",
+                    ["user_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chatrooms_user_id_created_at", table_name="chatrooms")
+    op.drop_index("ix_chatrooms_user_id_last_activity_at", table_name="chatrooms")
+    with op.batch_alter_table("chatrooms") as batch_op:
+        batch_op.drop_column("last_activity_at")
+        batch_op.drop_column("last_message_preview")
+        batch_op.drop_column("message_count")
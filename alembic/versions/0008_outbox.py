@@ -0,0 +1,45 @@
+"""add outbox and index messages awaiting a response
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("task", sa.String(), nullable=False),
+        sa.Column("args", sa.Text(), nullable=False),
+        sa.Column("kwargs", sa.Text(), nullable=False),
+        sa.Column("queue", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Messages sent before this revision are not marked, and not recovered
+    op.add_column("messages", sa.Column("awaiting_response", sa.Boolean(), nullable=False,
+                                        server_default=sa.false()))
+    op.create_index(
+        "ix_messages_pending_created_at", "messages", ["created_at"],
+        postgresql_where=sa.text("awaiting_response"),
+        sqlite_where=sa.text("awaiting_response"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_pending_created_at", table_name="messages")
+    op.drop_column("messages", "awaiting_response")
+    op.drop_table("outbox")
@@ -0,0 +1,36 @@
+"""add response_failed to messages
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00
+
+Marks responses that are an error message rather than a model answer,
+so they are not sent back to Gemini as context. Existing ones are found
+by the error text.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "messages",
+        sa.Column("response_failed", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.execute(
+        "UPDATE messages SET response_failed = true "
+        "WHERE gemini_response LIKE '%Sorry, I couldn''t process your request. Error: %'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("messages", "response_failed")
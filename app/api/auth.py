@@ -1,21 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from app.database import get_db
 from app.schemas.auth import UserSignup, SendOTP, VerifyOTP, ChangePassword, Token
 from app.models.user import User
 from app.services.otp_service import OTPService
-from app.core.auth import get_password_hash, verify_password, create_access_token, get_current_user
+from app.core.auth import hash_password, check_password, create_access_token, get_current_user, invalidate_user_cache
 from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/signup", status_code=status.HTTP_201_CREATED)
-async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
+async def signup(user_data: UserSignup, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    existing_user = db.query(User).filter(
-        User.mobile_number == user_data.mobile_number).first()
+    existing_user = await db.scalar(select(User).where(
+        User.mobile_number == user_data.mobile_number))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -23,30 +24,30 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
         )
 
     # Create new user
-    hashed_password = get_password_hash(
+    hashed_password = await hash_password(
         user_data.password) if user_data.password else None
     user = User(
         mobile_number=user_data.mobile_number,
         password_hash=hashed_password
     )
     db.add(user)
-    db.commit()
+    await db.commit()
 
     return {"message": "User created successfully"}
 
 
 @router.post("/send-otp")
-async def send_otp(otp_data: SendOTP, db: Session = Depends(get_db)):
+async def send_otp(otp_data: SendOTP, db: AsyncSession = Depends(get_db)):
     # Check if user exists
-    user = db.query(User).filter(User.mobile_number ==
-                                 otp_data.mobile_number).first()
+    user = await db.scalar(select(User).where(
+        User.mobile_number == otp_data.mobile_number))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    otp_code = OTPService.create_otp(otp_data.mobile_number, db)
+    otp_code = await OTPService.create_otp(otp_data.mobile_number, db)
 
     return {
         "message": "OTP sent successfully",
@@ -55,9 +56,9 @@ async def send_otp(otp_data: SendOTP, db: Session = Depends(get_db)):
 
 
 @router.post("/verify-otp", response_model=Token)
-async def verify_otp(otp_data: VerifyOTP, db: Session = Depends(get_db)):
+async def verify_otp(otp_data: VerifyOTP, db: AsyncSession = Depends(get_db)):
     # Verify OTP
-    if not OTPService.verify_otp(otp_data.mobile_number, otp_data.otp_code, db):
+    if not await OTPService.verify_otp(otp_data.mobile_number, otp_data.otp_code, db):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired OTP"
@@ -75,17 +76,17 @@ async def verify_otp(otp_data: VerifyOTP, db: Session = Depends(get_db)):
 
 
 @router.post("/forgot-password")
-async def forgot_password(otp_data: SendOTP, db: Session = Depends(get_db)):
+async def forgot_password(otp_data: SendOTP, db: AsyncSession = Depends(get_db)):
     # Check if user exists
-    user = db.query(User).filter(User.mobile_number ==
-                                 otp_data.mobile_number).first()
+    user = await db.scalar(select(User).where(
+        User.mobile_number == otp_data.mobile_number))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    otp_code = OTPService.create_otp(otp_data.mobile_number, db)
+    otp_code = await OTPService.create_otp(otp_data.mobile_number, db)
 
     return {
         "message": "Password reset OTP sent successfully",
@@ -97,17 +98,26 @@ async def forgot_password(otp_data: SendOTP, db: Session = Depends(get_db)):
 async def change_password(
     password_data: ChangePassword,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
+    # Cached user snapshots don't carry the password hash
+    password_hash = await db.scalar(
+        select(User.password_hash).where(User.id == current_user.id))
+
     # Verify current password
-    if not current_user.password_hash or not verify_password(password_data.current_password, current_user.password_hash):
+    valid = False
+    if password_hash:
+        valid = await check_password(password_data.current_password, password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid current password"
         )
 
-    # Update password
-    current_user.password_hash = get_password_hash(password_data.new_password)
-    db.commit()
+    # Update password (the new hash uses the current BCRYPT_ROUNDS)
+    await db.execute(update(User).where(User.id == current_user.id).values(
+        password_hash=await hash_password(password_data.new_password)))
+    await db.commit()
+    await invalidate_user_cache(current_user.mobile_number)
 
     return {"message": "Password changed successfully"}
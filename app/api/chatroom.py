@@ -1,124 +1,351 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import json
+import time
+from app.config import settings
 from app.database import get_db
-from app.core.auth import get_current_user
-from app.core.cache import cache
+from app.core.auth import get_current_user, invalidate_user_cache
+from app.core.cache import cache, cached, invalidate
 from app.core.rate_limiter import RateLimiter
 from app.models.user import User
 from app.models.chatroom import Chatroom
 from app.models.message import Message
-from app.schemas.chatroom import ChatroomCreate, ChatroomResponse, ChatroomDetail
-from app.schemas.message import MessageCreate, MessageResponse
-from app.tasks.gemini_tasks import process_gemini_message
+from app.schemas.chatroom import (
+    ChatroomCreate, ChatroomUpdate, ChatroomResponse, ChatroomDetail, ChatroomPage, ChatroomSort)
+from app.schemas.message import (
+    MessageCreate, MessageResponse, MessagePage, MessageImportResult,
+    MessageSearchPage, MessageSearchResult)
+from app.services.chatroom_service import ChatroomService
+from app.services.context_service import ContextService
+from app.services.outbox_service import OutboxService
+from app.services.search_service import SearchService
+from app.services.stream_service import StreamService
+from app.services.transfer_service import TransferError, TransferService
+from app.tasks.gemini_tasks import gemini_queue, process_gemini_message
 from pydantic import model_validator
 
 router = APIRouter(prefix="/chatroom", tags=["Chatroom"])
 
+PageLimit = Query(settings.message_page_size, ge=1,
+                  le=settings.message_page_max_size)
+
+
+async def get_message_page(
+    db: AsyncSession,
+    chatroom_id: int,
+    before_id: Optional[int],
+    limit: int
+) -> MessagePage:
+    # Keyset pagination on (chatroom_id, id): newest first, one extra row
+    # to know whether an older page exists
+    query = select(Message).where(Message.chatroom_id == chatroom_id)
+    if before_id is not None:
+        query = query.where(Message.id < before_id)
+    query = query.order_by(Message.id.desc()).limit(limit + 1)
+
+    messages = (await db.scalars(query)).all()
+    has_more = len(messages) > limit
+    messages = list(reversed(messages[:limit]))
+
+    return MessagePage(
+        messages=[MessageResponse.model_validate(m) for m in messages],
+        next_before_id=messages[0].id if has_more else None
+    )
+
+
+async def get_user_chatroom(db: AsyncSession, chatroom_id: int, user: User) -> Chatroom:
+    chatroom = await db.scalar(select(Chatroom).where(
+        Chatroom.id == chatroom_id,
+        Chatroom.user_id == user.id
+    ))
+
+    if not chatroom:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chatroom not found"
+        )
+    return chatroom
+
+
+# Cached chatroom views are stored as serialized response bodies and sent
+# as-is on a hit
+
+@cached("chatrooms", scope=lambda user_id, sort, before_id, limit, db: user_id,
+        key=lambda user_id, sort, before_id, limit, db: f"{sort.value}:{before_id}:{limit}",
+        raw=True)
+async def load_chatrooms(user_id: int, sort: ChatroomSort, before_id: Optional[int],
+                         limit: int, db: AsyncSession) -> bytes:
+    chatrooms = (await db.scalars(ChatroomService.page_query(
+        user_id, sort.value, before_id, limit))).all()
+    has_more = len(chatrooms) > limit
+    chatrooms = chatrooms[:limit]
+    return ChatroomPage(
+        chatrooms=[ChatroomResponse.model_validate(c) for c in chatrooms],
+        next_before_id=chatrooms[-1].id if has_more else None
+    ).model_dump_json().encode()
+
+
+@cached("chatroom", scope=lambda chatroom_id, user_id, limit, db: chatroom_id,
+        key=lambda chatroom_id, user_id, limit, db: f"{user_id}:{limit}", raw=True)
+async def load_chatroom_detail(chatroom_id: int, user_id: int, limit: int,
+                               db: AsyncSession) -> Optional[bytes]:
+    chatroom = await db.scalar(select(Chatroom).where(
+        Chatroom.id == chatroom_id,
+        Chatroom.user_id == user_id
+    ))
+    if not chatroom:
+        return None
+
+    page = await get_message_page(db, chatroom.id, None, limit)
+    return ChatroomDetail(
+        **ChatroomResponse.model_validate(chatroom).model_dump(),
+        messages=page.messages,
+        next_before_id=page.next_before_id
+    ).model_dump_json().encode()
+
+
+async def invalidate_chatroom(user_id: int, chatroom_id: int):
+    await invalidate(("chatrooms", user_id), ("chatroom", chatroom_id))
+
 
 @router.post("/", response_model=ChatroomResponse, status_code=status.HTTP_201_CREATED)
 async def create_chatroom(
     chatroom_data: ChatroomCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     chatroom = Chatroom(
         name=chatroom_data.name,
+        response_cache_bypass=chatroom_data.response_cache_bypass,
         user_id=current_user.id
     )
     db.add(chatroom)
-    db.commit()
-    db.refresh(chatroom)
+    await db.commit()
+    await db.refresh(chatroom)
 
-    # Invalidate cache
-    cache.delete(f"chatrooms:{current_user.id}")
+    # Also clears any cached 404 for the new id
+    await invalidate_chatroom(current_user.id, chatroom.id)
 
     return chatroom
 
 
-@router.get("/", response_model=List[ChatroomResponse])
+@router.get("/", response_model=ChatroomPage)
 async def get_chatrooms(
+    sort: ChatroomSort = ChatroomSort.last_activity,
+    before_id: Optional[int] = None,
+    limit: int = Query(settings.chatroom_page_size, ge=1,
+                       le=settings.chatroom_page_max_size),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    # Check cache first
-    cache_key = f"chatrooms:{current_user.id}"
-    cached_chatrooms = cache.get(cache_key)
-
-    if cached_chatrooms:
-        return cached_chatrooms
-
-    # Query database
-    chatrooms = db.query(Chatroom).filter(
-        Chatroom.user_id == current_user.id).all()
+    body = await load_chatrooms(current_user.id, sort, before_id, limit, db)
+    return Response(content=body, media_type="application/json")
 
-    # Convert to response format
-    chatrooms_data = [ChatroomResponse.from_orm(
-        chatroom) for chatroom in chatrooms]
 
-    # Cache the result (TTL: 5 minutes)
-    cache.set(cache_key, [chatroom.dict()
-              for chatroom in chatrooms_data], ttl=300)
+# Declared before /{chatroom_id} so "search" isn't taken for an id
+@router.get("/search", response_model=MessageSearchPage)
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(settings.search_page_size, ge=1,
+                       le=settings.search_page_max_size),
+    offset: int = Query(0, ge=0, le=settings.search_max_offset),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # One extra row to know whether another page exists
+    rows = await SearchService.search(db, current_user.id, q, limit + 1, offset)
+    has_more = len(rows) > limit
 
-    return chatrooms_data
+    return MessageSearchPage(
+        results=[
+            MessageSearchResult(
+                **MessageResponse.model_validate(message).model_dump(),
+                chatroom_id=message.chatroom_id,
+                rank=rank
+            )
+            for message, rank in rows[:limit]
+        ],
+        next_offset=offset + limit if has_more else None
+    )
 
 
 @router.get("/{chatroom_id}", response_model=ChatroomDetail)
 async def get_chatroom(
     chatroom_id: int,
+    limit: int = PageLimit,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    chatroom = db.query(Chatroom).filter(
-        Chatroom.id == chatroom_id,
-        Chatroom.user_id == current_user.id
-    ).first()
-
-    if not chatroom:
+    body = await load_chatroom_detail(chatroom_id, current_user.id, limit, db)
+    if body is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chatroom not found"
         )
+    return Response(content=body, media_type="application/json")
+
+
+@router.patch("/{chatroom_id}", response_model=ChatroomResponse)
+async def update_chatroom(
+    chatroom_id: int,
+    chatroom_data: ChatroomUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chatroom = await get_user_chatroom(db, chatroom_id, current_user)
+    for field, value in chatroom_data.model_dump(exclude_none=True).items():
+        setattr(chatroom, field, value)
+    await db.commit()
+    await db.refresh(chatroom)
+
+    await invalidate_chatroom(current_user.id, chatroom.id)
 
     return chatroom
 
 
+@router.get("/{chatroom_id}/messages", response_model=MessagePage)
+async def get_messages(
+    chatroom_id: int,
+    before_id: Optional[int] = None,
+    limit: int = PageLimit,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    chatroom = await get_user_chatroom(db, chatroom_id, current_user)
+    return await get_message_page(db, chatroom.id, before_id, limit)
+
+
 @router.post("/{chatroom_id}/message", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
 async def send_message(
     chatroom_id: int,
     message_data: MessageCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if chatroom exists and belongs to user
-    chatroom = db.query(Chatroom).filter(
-        Chatroom.id == chatroom_id,
-        Chatroom.user_id == current_user.id
-    ).first()
-
-    if not chatroom:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chatroom not found"
-        )
+    await get_user_chatroom(db, chatroom_id, current_user)
 
-    # Check rate limit
-    RateLimiter.check_message_limit(current_user, db)
+    # Check and consume rate limit quota
+    await RateLimiter.check_and_consume(current_user, db)
 
     # Create message
     message = Message(
         chatroom_id=chatroom_id,
-        user_message=message_data.user_message
+        user_message=message_data.user_message,
+        awaiting_response=True
     )
     db.add(message)
-    db.commit()
-    db.refresh(message)
+    await db.flush()
+    await db.execute(ChatroomService.record_message(chatroom_id, message_data.user_message))
+    # Process with Gemini API asynchronously, on the queue for the user's
+    # tier: the task is committed with the message and published by the
+    # outbox dispatcher, so a slow or unavailable broker never holds up
+    # the request or loses the message
+    OutboxService.add(db, process_gemini_message.name, [message.id],
+                      {"enqueued_at": time.time()}, gemini_queue(current_user.subscription_tier))
+    await db.commit()
+    await db.refresh(message)
 
-    # Increment message count
-    RateLimiter.increment_message_count(current_user, db)
-
-    # Process with Gemini API asynchronously
-    process_gemini_message.delay(message.id, message_data.user_message)
+    # The commit also synced the user's daily message count
+    await invalidate_user_cache(current_user.mobile_number)
+    await invalidate_chatroom(current_user.id, chatroom_id)
 
     # print(f"Message ID: {message.id}, User Message: {message_data.user_message}, Message: {message}")
     return message
+
+
+@router.post("/{chatroom_id}/import", response_model=MessageImportResult)
+async def import_messages(
+    chatroom_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    await get_user_chatroom(db, chatroom_id, current_user)
+
+    try:
+        imported = await TransferService.import_messages(db, chatroom_id, request.stream())
+    except TransferError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+
+    if imported:
+        await db.execute(ChatroomService.refresh_stats(chatroom_id))
+    await db.commit()
+
+    if imported:
+        await invalidate_chatroom(current_user.id, chatroom_id)
+        # Imported history changes the conversation, so rebuild the context
+        # window from the database on the next message
+        await cache.delete(ContextService.key(chatroom_id))
+
+    return MessageImportResult(chatroom_id=chatroom_id, imported=imported)
+
+
+@router.get("/{chatroom_id}/export")
+async def export_messages(
+    chatroom_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    await get_user_chatroom(db, chatroom_id, current_user)
+    # Release the connection before holding the stream open
+    await db.close()
+
+    return StreamingResponse(
+        TransferService.export_messages(chatroom_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="chatroom-{chatroom_id}.ndjson"'}
+    )
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/{chatroom_id}/message/{message_id}/stream")
+async def stream_message(
+    chatroom_id: int,
+    message_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    message = await db.scalar(select(Message).join(Chatroom).where(
+        Message.id == message_id,
+        Message.chatroom_id == chatroom_id,
+        Chatroom.user_id == current_user.id
+    ))
+
+    if not message:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Message not found"
+        )
+
+    gemini_response = message.gemini_response
+    # Release the connection before holding the stream open
+    await db.close()
+
+    async def event_stream():
+        if gemini_response is not None:
+            yield format_sse("chunk", {"text": gemini_response})
+            yield format_sse("done", {"message_id": message_id})
+            return
+
+        async for event in StreamService.listen(message_id):
+            if event["type"] == "chunk":
+                yield format_sse("chunk", {"text": event["text"]})
+            else:
+                yield format_sse(event["type"], {"message_id": message_id})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.core.auth import get_current_user
-from app.models.user import User, SubscriptionTier
-from app.services.stripe_service import StripeService
+from app.core.auth import get_current_user, invalidate_user_cache
+from app.core.rate_limiter import RateLimiter
+from app.models.stripe_event import StripeEvent
+from app.models.user import User
+from app.services.outbox_service import OutboxService
+from app.services.stripe_service import StripeService, get_stripe
+from app.tasks.gemini_tasks import STRIPE_QUEUE
+from app.tasks.stripe_tasks import process_stripe_event
 from app.config import settings
-import stripe
 
 router = APIRouter(tags=["Subscription"])
 
@@ -13,23 +19,27 @@ router = APIRouter(tags=["Subscription"])
 @router.post("/subscribe/pro")
 async def subscribe_pro(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
 
         # Create or get Stripe customer
-        if not current_user.stripe_customer_id:
-            customer = StripeService.create_customer(
+        customer_id = current_user.stripe_customer_id
+        if not customer_id:
+            customer = await StripeService.create_customer_async(
                 email=f"{current_user.mobile_number}@example.com",
                 name=f"User {current_user.mobile_number}"
             )
-            current_user.stripe_customer_id = customer.id
+            customer_id = customer.id
             print("Created Stripe customer:", customer.id)
-            db.commit()
+            await db.execute(update(User).where(User.id == current_user.id).values(
+                stripe_customer_id=customer_id))
+            await db.commit()
+            await invalidate_user_cache(current_user.mobile_number)
 
         # Create checkout session
-        session = StripeService.create_checkout_session(
-            customer_id=current_user.stripe_customer_id
+        session = await StripeService.create_checkout_session_async(
+            customer_id=customer_id
         )
 
         return {"checkout_url": session.url}
@@ -43,18 +53,20 @@ async def subscribe_pro(
 
 @router.get("/subscription/status")
 async def get_subscription_status(current_user: User = Depends(get_current_user)):
+    daily_limit = RateLimiter.daily_limit(current_user)
     return {
         "subscription_tier": current_user.subscription_tier,
-        "daily_message_count": current_user.daily_message_count,
-        "daily_limit": 5 if current_user.subscription_tier == SubscriptionTier.BASIC else "unlimited"
+        "daily_message_count": await RateLimiter.get_message_count(current_user),
+        "daily_limit": daily_limit if daily_limit is not None else "unlimited"
     }
 
 
 @router.post("/webhook/stripe")
-async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     payload = await request.body()
     sig_header = request.headers.get('stripe-signature')
 
+    stripe = get_stripe()
     try:
         event = stripe.Webhook.construct_event(
             payload, sig_header, settings.stripe_webhook_secret
@@ -64,27 +76,20 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-    # Handle the event
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        customer_id = session['customer']
-
-        # Update user subscription
-        user = db.query(User).filter(
-            User.stripe_customer_id == customer_id).first()
-        if user:
-            user.subscription_tier = SubscriptionTier.PRO
-            db.commit()
-
-    elif event['type'] == 'customer.subscription.deleted':
-        subscription = event['data']['object']
-        customer_id = subscription['customer']
-
-        # Downgrade user subscription
-        user = db.query(User).filter(
-            User.stripe_customer_id == customer_id).first()
-        if user:
-            user.subscription_tier = SubscriptionTier.BASIC
-            db.commit()
-
-    return {"status": "success"}
+    # The event and its task go into one transaction, through the outbox so
+    # the handler never waits on the broker; a redelivery of an event that
+    # was already processed is acknowledged without queueing it again
+    db.add(StripeEvent(id=event['id'], type=event['type'], payload=payload.decode()))
+    OutboxService.add(db, process_stripe_event.name, [event['id']], {}, STRIPE_QUEUE)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        existing = await db.get(StripeEvent, event['id'])
+        if existing is not None and existing.processed_at is not None:
+            return {"status": "duplicate"}
+        # Not processed yet (still queued, or out of retries): queue it again
+        OutboxService.add(db, process_stripe_event.name, [event['id']], {}, STRIPE_QUEUE)
+        await db.commit()
+
+    return {"status": "queued"}
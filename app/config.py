@@ -4,13 +4,101 @@ from typing import Optional
 
 class Settings(BaseSettings):
     database_url: str
+    async_database_url: Optional[str] = None
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800
+    db_pool_timeout: int = 30
+    db_warmup_connections: int = 5
     redis_url: str
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 300
+    otp_backend: str = "redis"
+    otp_ttl_seconds: int = 600
+    otp_max_attempts: int = 5
+    otp_purge_interval_seconds: int = 3600
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
     stripe_secret_key: str
     stripe_webhook_secret: str
+    stripe_api_base: Optional[str] = None
+    stripe_timeout_seconds: float = 10
+    stripe_max_network_retries: int = 2
+    stripe_workers: int = 8
+    stripe_pro_price_id: Optional[str] = None
+    stripe_pro_price_lookup_key: str = "gemini_pro_monthly"
     gemini_api_key: str
+    gemini_model_name: str = "gemini-2.5-flash"
+    gemini_transport: Optional[str] = None
+    gemini_api_endpoint: Optional[str] = None
+    gemini_execution_mode: str = "sync"
+    gemini_async_concurrency: int = 32
+    gemini_qps_per_key: Optional[float] = None
+    gemini_max_retries: int = 3
+    gemini_retry_base_delay: float = 0.5
+    gemini_retry_max_delay: float = 8.0
+    gemini_context_token_budget: int = 4000
+    gemini_context_max_turns: int = 20
+    gemini_context_ttl_seconds: int = 3600
+    gemini_pro_queue: str = "gemini_pro"
+    gemini_basic_queue: str = "gemini_basic"
+    gemini_pro_worker_concurrency: Optional[int] = 8
+    gemini_basic_worker_concurrency: Optional[int] = 4
+    celery_prefetch_multiplier: int = 1
+    celery_ignore_results: bool = True
+    celery_result_expires_seconds: int = 3600
+    celery_task_compression: Optional[str] = None
+    response_write_mode: str = "direct"
+    response_stream_key: str = "message_responses"
+    response_stream_group: str = "response_flusher"
+    response_flusher_name: str = "flusher"
+    response_flush_batch_size: int = 500
+    response_flush_max_latency_ms: int = 100
+    outbox_batch_size: int = 100
+    outbox_poll_interval_seconds: float = 0.2
+    message_recovery_interval_seconds: int = 60
+    message_stuck_after_seconds: int = 300
+    message_recovery_max_age_seconds: int = 86400
+    message_recovery_batch_size: int = 500
+    user_cache_enabled: bool = True
+    user_cache_ttl_seconds: int = 60
+    user_cache_local_ttl_seconds: int = 5
+    user_cache_local_max_size: int = 10000
+    basic_daily_message_limit: int = 5
+    pro_daily_message_limit: Optional[int] = None
+    message_burst_limit: Optional[int] = 10
+    pro_message_burst_limit: Optional[int] = None
+    message_burst_window_seconds: int = 60
+    redis_max_connections: int = 100
+    redis_pool_timeout_seconds: float = 5
+    redis_async_pool_timeout_seconds: float = 0.5
+    redis_pubsub_max_connections: int = 1000
+    cache_local_ttl_seconds: float = 2
+    cache_local_max_size: int = 10000
+    cache_serializer: str = "orjson"
+    cache_compress_threshold: Optional[int] = 1024
+    cache_compress_level: int = 1
+    cache_default_ttl_seconds: int = 300
+    cache_negative_ttl_seconds: int = 30
+    cache_lock_timeout_seconds: float = 5
+    cache_early_refresh_beta: float = 1.0
+    response_cache_enabled: bool = False
+    response_cache_ttl_seconds: int = 3600
+    response_cache_max_entries: int = 10000
+    message_page_size: int = 50
+    message_page_max_size: int = 200
+    stream_buffer_ttl_seconds: int = 300
+    stream_idle_timeout_seconds: int = 60
+    transfer_batch_size: int = 1000
+    transfer_max_line_bytes: int = 1024 * 1024
+    search_page_size: int = 20
+    search_page_max_size: int = 100
+    search_max_offset: int = 1000
+    chatroom_page_size: int = 20
+    chatroom_page_max_size: int = 100
+    chatroom_preview_length: int = 120
+    worker_metrics_port: Optional[int] = 9100
     environment: str = "development"
 
     class Config:
@@ -1,17 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import json
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
+from app.core.cache import LRUCache, async_redis_client
 from app.database import get_db
-from app.models.user import User
+from app.models.user import User, SubscriptionTier
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# BCRYPT_ROUNDS applies to new hashes; passwords are only verified on
+# change-password, which stores a new hash made with the current rounds
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the
+# event loop without blocking other requests
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
 security = HTTPBearer()
 
+# Snapshots of authenticated users, keyed by token subject (mobile number).
+# The in-process tier has a very short TTL since it can only be invalidated
+# in the process that made the change; Redis is invalidated everywhere.
+# password_hash is deliberately left out of snapshots.
+user_snapshots = LRUCache(
+    max_size=settings.user_cache_local_max_size,
+    ttl=settings.user_cache_local_ttl_seconds
+)
+USER_SNAPSHOT_FIELDS = (
+    "id", "mobile_number", "subscription_tier", "daily_message_count",
+    "last_message_date", "stripe_customer_id", "created_at", "updated_at"
+)
+USER_SNAPSHOT_DATETIMES = ("last_message_date", "created_at", "updated_at")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,6 +47,17 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_executor, verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -33,12 +70,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     mobile_number = verify_token(credentials.credentials)
-    user = db.query(User).filter(User.mobile_number == mobile_number).first()
+    user = await get_cached_user(mobile_number)
+    if user is None:
+        user = await db.scalar(select(User).where(User.mobile_number == mobile_number))
+        if user is not None:
+            await cache_user(user)
 
     if user is None:
         raise HTTPException(
@@ -70,3 +111,68 @@ def verify_token(token: str):
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+def user_cache_key(mobile_number: str) -> str:
+    return f"user:{mobile_number}"
+
+
+def snapshot_user(user: User) -> dict:
+    snapshot = {field: getattr(user, field) for field in USER_SNAPSHOT_FIELDS}
+    snapshot["subscription_tier"] = user.subscription_tier.value if user.subscription_tier else None
+    for field in USER_SNAPSHOT_DATETIMES:
+        if snapshot[field] is not None:
+            snapshot[field] = snapshot[field].isoformat()
+    return snapshot
+
+
+def user_from_snapshot(snapshot: dict) -> User:
+    # Detached instance: handlers must write through explicit UPDATEs
+    data = dict(snapshot)
+    if data["subscription_tier"] is not None:
+        data["subscription_tier"] = SubscriptionTier(data["subscription_tier"])
+    for field in USER_SNAPSHOT_DATETIMES:
+        if data[field] is not None:
+            data[field] = datetime.fromisoformat(data[field])
+    return User(**data)
+
+
+async def get_cached_user(mobile_number: str) -> Optional[User]:
+    if not settings.user_cache_enabled:
+        return None
+
+    snapshot = user_snapshots.get(mobile_number)
+    if snapshot is None:
+        try:
+            data = await async_redis_client.get(user_cache_key(mobile_number))
+        except Exception:
+            return None
+        if data is None:
+            return None
+        snapshot = json.loads(data)
+        user_snapshots.set(mobile_number, snapshot)
+    return user_from_snapshot(snapshot)
+
+
+async def cache_user(user: User):
+    if not settings.user_cache_enabled:
+        return
+
+    snapshot = snapshot_user(user)
+    user_snapshots.set(user.mobile_number, snapshot)
+    try:
+        await async_redis_client.setex(
+            user_cache_key(user.mobile_number),
+            settings.user_cache_ttl_seconds,
+            json.dumps(snapshot)
+        )
+    except Exception:
+        pass
+
+
+async def invalidate_user_cache(mobile_number: str):
+    user_snapshots.delete(mobile_number)
+    try:
+        await async_redis_client.delete(user_cache_key(mobile_number))
+    except Exception:
+        pass
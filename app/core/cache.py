@@ -1,35 +1,483 @@
 import redis
+import redis.asyncio as aioredis
+import asyncio
+import functools
 import json
-from typing import Optional, Any
+import logging
+import hashlib
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Any, Callable, Dict, List, Tuple
 from app.config import settings
+from app.core.metrics import record_cache, record_response_cache
+from app.core.serializers import Codec, OrjsonSerializer, get_codec
 
-redis_client = redis.from_url(settings.redis_url)
+logger = logging.getLogger(__name__)
+
+class WaitingConnectionPool(aioredis.BlockingConnectionPool):
+    # redis-py's asyncio BlockingConnectionPool connects while holding its
+    # condition and, if that fails, releases the connection through the same
+    # condition, stalling for the whole timeout on every call while Redis is
+    # unreachable. Here only the wait for a free connection is timed out and
+    # the connect happens outside it, so connection errors surface at once.
+
+    async def get_connection(self, command_name, *keys, **options):
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with self._condition:
+                    await self._condition.wait_for(
+                        lambda: self._available_connections
+                        or len(self._in_use_connections) < self.max_connections)
+                    try:
+                        connection = self._available_connections.pop()
+                    except IndexError:
+                        connection = self.make_connection()
+                    self._in_use_connections.add(connection)
+        except TimeoutError:
+            raise redis.ConnectionError("No connection available.") from None
+
+        try:
+            await self.ensure_connection(connection)
+        except BaseException:
+            await self.release(connection)
+            raise
+        return connection
+
+
+# Both pools are bounded by REDIS_MAX_CONNECTIONS per process. Worker
+# threads wait up to REDIS_POOL_TIMEOUT_SECONDS for a free connection, the
+# API only up to REDIS_ASYNC_POOL_TIMEOUT_SECONDS, so a burst of requests
+# queues briefly instead of failing.
+redis_pool = redis.BlockingConnectionPool.from_url(
+    settings.redis_url, max_connections=settings.redis_max_connections,
+    timeout=settings.redis_pool_timeout_seconds)
+redis_client = redis.Redis(connection_pool=redis_pool)
+async_redis_pool = WaitingConnectionPool.from_url(
+    settings.redis_url, max_connections=settings.redis_max_connections,
+    timeout=settings.redis_async_pool_timeout_seconds)
+async_redis_client = aioredis.Redis(connection_pool=async_redis_pool)
+# SSE listeners hold a subscribed connection for the whole stream; they get
+# their own pool so open streams can never starve the API pool
+async_pubsub_pool = aioredis.ConnectionPool.from_url(
+    settings.redis_url, max_connections=settings.redis_pubsub_max_connections)
+async_pubsub_client = aioredis.Redis(connection_pool=async_pubsub_pool)
+
+
+def pool_exhausted(error: Exception) -> bool:
+    # No connection freed up within the pool timeout; unlike other
+    # ConnectionErrors, Redis itself is reachable
+    return isinstance(error, redis.ConnectionError) and str(error) in (
+        "Too many connections", "No connection available.")
+
+
+class LRUCache:
+    # Small in-process cache with per-entry expiry, evicting the least
+    # recently used entry once max_size is reached
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + (ttl or self.ttl))
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
 
 
 class CacheService:
-    def __init__(self):
+    # Cache used by the API: an in-process LRU tier with a short TTL in
+    # front of Redis. Values are kept encoded in both tiers. Cache failures
+    # never fail the request, but they are logged and counted.
+
+    def __init__(self, redis_client, codec: Codec, local: Optional[LRUCache] = None):
         self.redis = redis_client
+        self.codec = codec
+        self.local = local
+
+    async def get_raw_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        values = [self.local.get(key) if self.local else None for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            try:
+                found = await self.redis.mget([keys[i] for i in missing])
+            except Exception as e:
+                logger.warning("Cache get failed for %s: %s", keys, e)
+                record_cache("get", "error")
+                return values
+            for i, data in zip(missing, found):
+                if data is not None:
+                    values[i] = data
+                    if self.local:
+                        self.local.set(keys[i], data)
+
+        for i, value in enumerate(values):
+            if value is None:
+                record_cache("get", "miss")
+            else:
+                record_cache("get", "hit" if i in missing else "local_hit")
+        return values
+
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        return (await self.get_raw_many([key]))[0]
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        return [self.codec.decode(data) if data else None
+                for data in await self.get_raw_many(keys)]
+
+    async def get(self, key: str) -> Optional[Any]:
+        return (await self.get_many([key]))[0]
+
+    async def set_raw_many(self, items: Dict[str, bytes], ttl: int = 300):
+        if self.local:
+            for key, data in items.items():
+                self.local.set(key, data, min(ttl, self.local.ttl))
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, data in items.items():
+                pipe.set(key, data, ex=ttl)
+            await pipe.execute()
+            record_cache("set", "ok")
+        except Exception as e:
+            logger.warning("Cache set failed for %s: %s", list(items), e)
+            record_cache("set", "error")
+
+    async def set_raw(self, key: str, data: bytes, ttl: int = 300):
+        await self.set_raw_many({key: data}, ttl)
+
+    async def set_many(self, items: Dict[str, Any], ttl: int = 300):
+        await self.set_raw_many(
+            {key: self.codec.encode(value) for key, value in items.items()}, ttl)
+
+    async def set(self, key: str, value: Any, ttl: int = 300):
+        await self.set_many({key: value}, ttl)
+
+    async def delete(self, *keys: str):
+        if self.local:
+            for key in keys:
+                self.local.delete(key)
+        try:
+            await self.redis.delete(*keys)
+            record_cache("delete", "ok")
+        except Exception as e:
+            logger.warning("Cache delete failed for %s: %s", keys, e)
+            record_cache("delete", "error")
+
+
+class SyncCacheService:
+    # Blocking variant for Celery workers
+
+    def __init__(self, redis_client, codec: Codec):
+        self.redis = redis_client
+        self.codec = codec
 
     def get(self, key: str) -> Optional[Any]:
         try:
             data = self.redis.get(key)
-            if data:
-                return json.loads(data)
-            return None
-        except Exception:
+            value = self.codec.decode(data) if data else None
+        except Exception as e:
+            logger.warning("Cache get failed for %s: %s", key, e)
+            record_cache("get", "error")
             return None
+        record_cache("get", "miss" if value is None else "hit")
+        return value
 
     def set(self, key: str, value: Any, ttl: int = 300):
         try:
-            self.redis.setex(key, ttl, json.dumps(value, default=str))
-        except Exception:
-            pass
+            self.redis.setex(key, ttl, self.codec.encode(value))
+            record_cache("set", "ok")
+        except Exception as e:
+            logger.warning("Cache set failed for %s: %s", key, e)
+            record_cache("set", "error")
 
     def delete(self, key: str):
         try:
             self.redis.delete(key)
+            record_cache("delete", "ok")
+        except Exception as e:
+            logger.warning("Cache delete failed for %s: %s", key, e)
+            record_cache("delete", "error")
+
+
+codec = get_codec(
+    settings.cache_serializer, settings.cache_compress_threshold, settings.cache_compress_level)
+cache = CacheService(async_redis_client, codec, LRUCache(
+    settings.cache_local_max_size, settings.cache_local_ttl_seconds))
+sync_cache = SyncCacheService(redis_client, codec)
+
+
+class ResponseCache:
+    # Caches Gemini responses under a hash of the model, the normalized
+    # prompt and the conversation context sent with it. A sorted set of
+    # last-access times bounds the number of entries (LRU eviction).
+    PREFIX = "gemini_response"
+
+    def __init__(self, cache: SyncCacheService):
+        self.cache = cache
+
+    @property
+    def lru_key(self) -> str:
+        return f"{self.PREFIX}:lru"
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        prompt = re.sub(r"\s+", " ", prompt.strip().lower())
+        return prompt.rstrip(" .!?")
+
+    def key(self, prompt: str, model: str, context: List[dict]) -> str:
+        context_hash = hashlib.sha256(
+            json.dumps(context, sort_keys=True).encode()).hexdigest()
+        digest = hashlib.sha256(json.dumps(
+            [model, self.normalize(prompt), context_hash]).encode()).hexdigest()
+        return f"{self.PREFIX}:{digest}"
+
+    def get(self, key: str) -> Optional[str]:
+        response = self.cache.get(key)
+        record_response_cache(response is not None)
+        if response is not None:
+            try:
+                self.cache.redis.zadd(self.lru_key, {key: time.time()})
+            except Exception:
+                pass
+        return response
+
+    def set(self, key: str, response: str):
+        self.cache.set(key, response, ttl=settings.response_cache_ttl_seconds)
+        try:
+            now = time.time()
+            pipe = self.cache.redis.pipeline()
+            pipe.zadd(self.lru_key, {key: now})
+            # Forget entries that already expired through their TTL
+            pipe.zremrangebyscore(
+                self.lru_key, 0, now - settings.response_cache_ttl_seconds)
+            pipe.zcard(self.lru_key)
+            size = pipe.execute()[-1]
+
+            overflow = size - settings.response_cache_max_entries
+            if overflow > 0:
+                evicted = [k for k, _ in self.cache.redis.zpopmin(self.lru_key, overflow)]
+                self.cache.redis.delete(*evicted)
         except Exception:
             pass
 
+    def size(self) -> int:
+        return self.cache.redis.zcard(self.lru_key)
+
+
+response_cache = ResponseCache(sync_cache)
+
+
+# Versions outlive any cached entry, so an expired version never brings
+# back entries cached under an earlier one
+VERSION_TTL = 7 * 24 * 3600
+
+# Read-through entries: (load time, expiry) header, then the codec payload
+ENTRY_HEADER = struct.Struct("!dd")
+# Response bodies are always JSON, whatever the cache serializer
+body_serializer = OrjsonSerializer()
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+release_lock_script = cache.redis.register_script(RELEASE_LOCK_SCRIPT)
+
+
+def version_key(namespace: str, scope: Any) -> str:
+    return f"{namespace}:{scope}:version"
+
+
+async def invalidate(*scopes: Tuple[str, Any]):
+    # Moves each (namespace, scope) to a new version; entries cached under
+    # the old one are no longer read and expire on their own
+    try:
+        pipe = cache.redis.pipeline(transaction=False)
+        for namespace, scope in scopes:
+            pipe.incr(version_key(namespace, scope))
+            pipe.expire(version_key(namespace, scope), VERSION_TTL)
+        await pipe.execute()
+        record_cache("invalidate", "ok")
+    except Exception as e:
+        logger.warning("Cache invalidation failed for %s: %s", scopes, e)
+        record_cache("invalidate", "error")
+
+
+def invalidate_sync(*scopes: Tuple[str, Any]):
+    try:
+        pipe = sync_cache.redis.pipeline(transaction=False)
+        for namespace, scope in scopes:
+            pipe.incr(version_key(namespace, scope))
+            pipe.expire(version_key(namespace, scope), VERSION_TTL)
+        pipe.execute()
+        record_cache("invalidate", "ok")
+    except Exception as e:
+        logger.warning("Cache invalidation failed for %s: %s", scopes, e)
+        record_cache("invalidate", "error")
+
 
-cache = CacheService()
+def cached(namespace: str, scope: Callable[..., Any], key: Optional[Callable[..., str]] = None,
+           ttl: Optional[int] = None, negative_ttl: Optional[int] = None, raw: bool = False):
+    # Read-through cache for async loaders. Entries live under
+    # {namespace}:{scope}:v{version}[:{key}], so invalidate((namespace, scope))
+    # drops every entry of a scope at once. A loader returning None is
+    # cached for negative_ttl. On a miss only the caller holding the lock
+    # loads; the others wait for its result. Entries are also refreshed
+    # early, with a probability rising towards expiry (XFetch), so hot keys
+    # are reloaded before they expire rather than all at once after.
+    # With raw=True the value (or the bytes the loader already serialized) is
+    # kept and returned as JSON bytes, ready to be sent as a response body
+    # without decoding or validation.
+    ttl = ttl or settings.cache_default_ttl_seconds
+    negative_ttl = negative_ttl or settings.cache_negative_ttl_seconds
+
+    def decorator(func):
+        async def call(args, kwargs) -> Any:
+            value = await func(*args, **kwargs)
+            if raw and value is not None and not isinstance(value, bytes):
+                return body_serializer.dumps(value)
+            return value
+
+        async def load(entry_key: str, args, kwargs, lock: Optional[str] = None):
+            started = time.monotonic()
+            try:
+                value = await call(args, kwargs)
+            except BaseException:
+                if lock:
+                    await release_lock(entry_key, lock)
+                raise
+            delta = time.monotonic() - started
+            entry_ttl = ttl if value is not None else negative_ttl
+            if raw and value is not None:
+                payload = cache.codec.pack(value, body_serializer.marker)
+            else:
+                payload = cache.codec.encode(value)
+            await cache.set_raw(entry_key, ENTRY_HEADER.pack(
+                delta, time.time() + entry_ttl) + payload, entry_ttl)
+            if lock:
+                await release_lock(entry_key, lock)
+            return value
+
+        def read(entry: bytes) -> Any:
+            payload = entry[ENTRY_HEADER.size:]
+            if raw:
+                _, body = Codec.unpack(payload)
+                return None if body == b"null" else body
+            return cache.codec.decode(payload)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            scope_value = scope(*args, **kwargs)
+            # The version always comes from Redis; entries, being immutable
+            # per version, can also be served from the in-process tier
+            try:
+                version = int(await cache.redis.get(version_key(namespace, scope_value)) or 0)
+            except Exception as e:
+                logger.warning("Cache get failed for %s:%s: %s", namespace, scope_value, e)
+                record_cache("get", "error")
+                return await call(args, kwargs)
+            entry_key = f"{namespace}:{scope_value}:v{version}"
+            if key is not None:
+                entry_key = f"{entry_key}:{key(*args, **kwargs)}"
+
+            entry = await cache.get_raw(entry_key)
+            if entry is not None:
+                if not refresh_early(entry):
+                    return read(entry)
+                lock = await acquire_lock(entry_key)
+                if lock is None:
+                    # Another caller is already refreshing it
+                    return read(entry)
+                record_cache("get", "early_refresh")
+                return await load(entry_key, args, kwargs, lock)
+
+            lock = await acquire_lock(entry_key)
+            if lock is not None:
+                return await load(entry_key, args, kwargs, lock)
+
+            entry = await wait_for_entry(entry_key)
+            if entry is not None:
+                return read(entry)
+            return await load(entry_key, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def refresh_early(entry: bytes) -> bool:
+    # XFetch: recompute when now - delta * beta * ln(rand) passes the expiry
+    delta, expires = ENTRY_HEADER.unpack_from(entry)
+    beta = settings.cache_early_refresh_beta
+    return time.time() - delta * beta * math.log(1 - random.random()) >= expires
+
+
+async def acquire_lock(entry_key: str) -> Optional[str]:
+    token = uuid.uuid4().hex
+    try:
+        if await cache.redis.set(f"{entry_key}:lock", token, nx=True,
+                           px=int(settings.cache_lock_timeout_seconds * 1000)):
+            return token
+        return None
+    except Exception:
+        return token
+
+
+async def release_lock(entry_key: str, token: str):
+    try:
+        await release_lock_script(keys=[f"{entry_key}:lock"], args=[token])
+    except Exception:
+        pass
+
+
+async def wait_for_entry(entry_key: str) -> Optional[bytes]:
+    # Polls until the lock holder has stored the entry; gives up (and loads
+    # directly) if the lock is released or times out without one
+    deadline = time.monotonic() + settings.cache_lock_timeout_seconds
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+        try:
+            pipe = cache.redis.pipeline(transaction=False)
+            pipe.get(entry_key)
+            pipe.exists(f"{entry_key}:lock")
+            raw, locked = await pipe.execute()
+        except Exception:
+            return None
+        if raw is not None:
+            if cache.local:
+                cache.local.set(entry_key, raw)
+            return raw
+        if not locked:
+            return None
+    return None
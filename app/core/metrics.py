@@ -0,0 +1,183 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Iterable, Optional
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY,
+    generate_latest, multiprocess, start_http_server)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# With several API or worker processes, set PROMETHEUS_MULTIPROC_DIR to a
+# shared, empty directory so every process's metrics are aggregated
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"])
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued per HTTP request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55))
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Time spent in database queries per HTTP request",
+    ["route"])
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Database query latency")
+CACHE_OPERATIONS = Counter(
+    "cache_operations_total", "Cache operations by outcome",
+    ["operation", "result"])
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "response_cache_lookups_total", "Gemini response cache lookups", ["result"])
+GEMINI_LATENCY = Histogram(
+    "gemini_generation_duration_seconds", "Gemini generation latency",
+    ["mode", "result"], buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60))
+GEMINI_TOKENS = Counter(
+    "gemini_tokens_total", "Estimated Gemini tokens", ["direction"])
+GEMINI_QUEUE_WAIT = Histogram(
+    "gemini_queue_wait_seconds", "Time messages wait in the queue before a worker picks them up",
+    ["queue"], buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+
+# Per-request query counters, set by MetricsMiddleware and filled in by the
+# engine event hooks
+request_db_stats: ContextVar[Optional[dict]] = ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_DURATION.observe(elapsed)
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats["queries"] += 1
+            stats["duration"] += elapsed
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware, so streaming responses pass through untouched.
+    # Requests are labelled by route template to keep label cardinality low.
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = {"queries": 0, "duration": 0.0}
+        token = request_db_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], path, status_code).observe(
+                time.perf_counter() - started)
+            REQUEST_DB_QUERIES.labels(path).observe(stats["queries"])
+            REQUEST_DB_DURATION.labels(path).observe(stats["duration"])
+            request_db_stats.reset(token)
+
+
+def record_cache(operation: str, result: str):
+    CACHE_OPERATIONS.labels(operation, result).inc()
+
+
+def record_response_cache(hit: bool):
+    RESPONSE_CACHE_LOOKUPS.labels("hit" if hit else "miss").inc()
+
+
+def record_generation(mode: str, result: str, duration: float,
+                      prompt_tokens: int, response_tokens: int):
+    GEMINI_LATENCY.labels(mode, result).observe(duration)
+    GEMINI_TOKENS.labels("prompt").inc(prompt_tokens)
+    GEMINI_TOKENS.labels("response").inc(response_tokens)
+
+
+def record_queue_wait(enqueued_at: Optional[float], queue: Optional[str]):
+    if enqueued_at is not None:
+        GEMINI_QUEUE_WAIT.labels(queue or "unknown").observe(
+            max(0.0, time.time() - enqueued_at))
+
+
+class QueueDepthCollector:
+    # Reads the length of each broker queue (a Redis list) at scrape time,
+    # so the value is current and needs no multiprocess bookkeeping
+
+    def __init__(self, redis_client, queues: Iterable[str]):
+        self.redis = redis_client
+        self.queues = list(queues)
+
+    def collect(self):
+        depth = GaugeMetricFamily(
+            "celery_queue_depth", "Tasks waiting in each Celery queue", labels=["queue"])
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for queue in self.queues:
+                pipe.llen(queue)
+            lengths = pipe.execute()
+        except Exception as e:
+            logger.warning("Reading queue depth failed: %s", e)
+            lengths = []
+        for queue, length in zip(self.queues, lengths):
+            depth.add_metric([queue], length)
+        yield depth
+
+
+class ResponseCacheSizeCollector:
+    # Reads the number of cached Gemini responses at scrape time
+
+    def __init__(self, response_cache):
+        self.response_cache = response_cache
+
+    def collect(self):
+        entries = GaugeMetricFamily(
+            "response_cache_entries", "Gemini responses in the response cache")
+        try:
+            entries.add_metric([], self.response_cache.size())
+        except Exception as e:
+            logger.warning("Reading response cache size failed: %s", e)
+        yield entries
+
+
+def get_registry() -> CollectorRegistry:
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> bytes:
+    return generate_latest(get_registry())
+
+
+def start_metrics_server(port: int, collectors: Iterable = ()):
+    registry = get_registry()
+    for collector in collectors:
+        registry.register(collector)
+    start_http_server(port, registry=registry)
+    logger.info("Serving metrics on port %s", port)
+
+
+def mark_process_dead(pid: int):
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
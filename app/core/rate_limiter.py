@@ -1,35 +1,133 @@
-from datetime import datetime, date
-from sqlalchemy.orm import Session
+from datetime import datetime, date, time, timedelta
+from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
+from app.config import settings
+from app.core.cache import async_redis_client, pool_exhausted
 from app.models.user import User, SubscriptionTier
 
+# Checks both limits and increments both counters in one atomic step, so
+# concurrent sends can never push a user past their quota.
+# KEYS: daily counter, burst counter
+# ARGV: daily limit (-1 = unlimited), daily expiry (unix time),
+#       burst limit (-1 = unlimited), burst window (seconds)
+# Returns {status, daily count}: 0 = allowed, 1 = daily limit, 2 = burst limit
+CONSUME_SCRIPT = """
+local daily = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tonumber(ARGV[1]) >= 0 and daily >= tonumber(ARGV[1]) then
+    return {1, daily}
+end
+local burst = tonumber(redis.call('GET', KEYS[2]) or '0')
+if tonumber(ARGV[3]) >= 0 and burst >= tonumber(ARGV[3]) then
+    return {2, daily}
+end
+daily = redis.call('INCR', KEYS[1])
+redis.call('EXPIREAT', KEYS[1], ARGV[2])
+if redis.call('INCR', KEYS[2]) == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+end
+return {0, daily}
+"""
+
+consume_script = async_redis_client.register_script(CONSUME_SCRIPT)
+
+DAILY_LIMIT_DETAIL = "Daily message limit exceeded. Upgrade to Pro for unlimited messages."
+BURST_LIMIT_DETAIL = "Too many messages in a short time. Please slow down."
+BUSY_DETAIL = "Server busy, please retry."
+
 
 class RateLimiter:
     @staticmethod
-    def check_message_limit(user: User, db: Session):
+    def daily_limit(user: User) -> Optional[int]:
+        if user.subscription_tier == SubscriptionTier.PRO:
+            return settings.pro_daily_message_limit
+        return settings.basic_daily_message_limit
+
+    @staticmethod
+    def burst_limit(user: User) -> Optional[int]:
         if user.subscription_tier == SubscriptionTier.PRO:
-            return True
+            return settings.pro_message_burst_limit
+        return settings.message_burst_limit
+
+    @staticmethod
+    def daily_key(user_id: int, day: date) -> str:
+        return f"rate_limit:daily:{user_id}:{day.isoformat()}"
+
+    @staticmethod
+    def burst_key(user_id: int) -> str:
+        return f"rate_limit:burst:{user_id}"
 
+    @staticmethod
+    async def consume(user: User) -> int:
+        # Counts one message against the user's quotas in Redis and returns
+        # today's count, or raises 429 without counting it
         today = date.today()
+        midnight = datetime.combine(today + timedelta(days=1), time.min)
+        daily_limit = RateLimiter.daily_limit(user)
+        burst_limit = RateLimiter.burst_limit(user)
 
-        # Reset daily count if it's a new day
-        if user.last_message_date is None or user.last_message_date.date() != today:
-            user.daily_message_count = 0
-            user.last_message_date = datetime.now()
-            db.commit()
+        result, count = await consume_script(
+            keys=[RateLimiter.daily_key(user.id, today),
+                  RateLimiter.burst_key(user.id)],
+            args=[
+                -1 if daily_limit is None else daily_limit,
+                int(midnight.timestamp()),
+                -1 if burst_limit is None else burst_limit,
+                settings.message_burst_window_seconds,
+            ]
+        )
 
-        # Check if user has exceeded daily limit
-        if user.daily_message_count >= 5:
+        if result:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Daily message limit exceeded. Upgrade to Pro for unlimited messages."
+                detail=DAILY_LIMIT_DETAIL if result == 1 else BURST_LIMIT_DETAIL
             )
+        return count
+
+    @staticmethod
+    async def get_message_count(user: User) -> int:
+        try:
+            count = await async_redis_client.get(
+                RateLimiter.daily_key(user.id, date.today()))
+            return int(count or 0)
+        except Exception:
+            return user.daily_message_count or 0
+
+    @staticmethod
+    async def check_and_consume(user: User, db: AsyncSession):
+        try:
+            count = await RateLimiter.consume(user)
+        except HTTPException:
+            raise
+        except Exception as e:
+            # Every pooled connection busy: Redis is up, and counting from
+            # the database would let concurrent sends overshoot the quota
+            if pool_exhausted(e):
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=BUSY_DETAIL
+                )
+            # Redis unavailable: fall back to the (non-atomic) database count
+            count = RateLimiter.check_database_count(user)
 
-        return True
+        # Sync the count lazily: the UPDATE is only staged here and goes out
+        # with the caller's next commit
+        await db.execute(update(User).where(User.id == user.id).values(
+            daily_message_count=count,
+            last_message_date=datetime.now()
+        ))
 
     @staticmethod
-    def increment_message_count(user: User, db: Session):
-        if user.subscription_tier == SubscriptionTier.BASIC:
-            user.daily_message_count += 1
-            user.last_message_date = datetime.now()
-            db.commit()
+    def check_database_count(user: User) -> int:
+        count = user.daily_message_count or 0
+        if user.last_message_date is None or user.last_message_date.date() != date.today():
+            count = 0
+
+        daily_limit = RateLimiter.daily_limit(user)
+        if daily_limit is not None and count >= daily_limit:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=DAILY_LIMIT_DETAIL
+            )
+        return count + 1
@@ -0,0 +1,103 @@
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
+import msgpack
+import orjson
+
+
+class Serializer:
+    name = ""
+    marker = 0
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JSONSerializer(Serializer):
+    name = "json"
+    marker = 1
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=str).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(Serializer):
+    name = "orjson"
+    marker = 2
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=str)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    name = "msgpack"
+    marker = 3
+
+    @staticmethod
+    def default(value: Any) -> Any:
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return str(value)
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=self.default)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data)
+
+
+SERIALIZERS = {s.name: s() for s in (JSONSerializer, OrjsonSerializer, MsgpackSerializer)}
+SERIALIZERS_BY_MARKER = {s.marker: s for s in SERIALIZERS.values()}
+
+
+class Codec:
+    # Serializer plus zlib compression for payloads larger than
+    # compress_threshold bytes. Encoded values start with a marker byte
+    # naming the serializer (high bit set when compressed), so values
+    # written with another serializer still decode. Values without a marker
+    # are plain JSON written before codecs existed.
+    COMPRESSED = 0x80
+
+    def __init__(self, serializer: Serializer, compress_threshold: Optional[int] = None,
+                 compress_level: int = 1):
+        self.serializer = serializer
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+
+    def pack(self, data: bytes, marker: int) -> bytes:
+        if self.compress_threshold is not None and len(data) > self.compress_threshold:
+            return bytes([marker | self.COMPRESSED]) + zlib.compress(data, self.compress_level)
+        return bytes([marker]) + data
+
+    @classmethod
+    def unpack(cls, data: bytes) -> Tuple[int, bytes]:
+        marker, payload = data[0], data[1:]
+        if marker & cls.COMPRESSED:
+            return marker & ~cls.COMPRESSED, zlib.decompress(payload)
+        return marker, payload
+
+    def encode(self, value: Any) -> bytes:
+        return self.pack(self.serializer.dumps(value), self.serializer.marker)
+
+    def decode(self, data: bytes) -> Any:
+        if data[0] & ~self.COMPRESSED not in SERIALIZERS_BY_MARKER:
+            return json.loads(data)
+        marker, payload = self.unpack(data)
+        return SERIALIZERS_BY_MARKER[marker].loads(payload)
+
+
+def get_codec(name: str, compress_threshold: Optional[int] = None,
+              compress_level: int = 1) -> Codec:
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown cache serializer: {name}")
+    return Codec(SERIALIZERS[name], compress_threshold, compress_level)
@@ -1,16 +1,55 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.core.metrics import instrument_engine
 
-engine = create_engine(settings.database_url)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url() -> str:
+    if settings.async_database_url:
+        return settings.async_database_url
+
+    url = make_url(settings.database_url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def get_pool_options() -> dict:
+    if settings.database_url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_pre_ping": True,
+    }
+
+
+# Sync engine, used by Celery workers and alembic
+engine = create_engine(settings.database_url, **get_pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine, used by the API
+async_engine = create_async_engine(get_async_database_url(), **get_pool_options())
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
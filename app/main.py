@@ -1,18 +1,61 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from sqlalchemy import text
 from app.api import auth, user, chatroom, subscription
-from app.database import engine, Base
-from app.models import user as user_model, chatroom as chatroom_model, message as message_model, otp as otp_model
+from app.config import settings
+from app.core.cache import async_pubsub_pool, async_redis_client, async_redis_pool
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.database import async_engine
+from app.models import user as user_model, chatroom as chatroom_model, message as message_model, otp as otp_model, outbox as outbox_model, stripe_event as stripe_event_model
 from fastapi.staticfiles import StaticFiles
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# The schema is managed by alembic migrations (alembic upgrade head)
+
+
+async def ping_database():
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def warm_up():
+    # Opens pooled database connections and the Redis connection before the
+    # first request instead of during it. Failures are only logged; requests
+    # report them as they would without the warm-up.
+    started = time.perf_counter()
+    connections = min(settings.db_warmup_connections, settings.db_pool_size)
+    try:
+        await asyncio.gather(*(ping_database() for _ in range(connections)))
+    except Exception as e:
+        logger.warning("Database warm-up failed: %s", e)
+    try:
+        await async_redis_client.ping()
+    except Exception as e:
+        logger.warning("Redis warm-up failed: %s", e)
+    logger.info("Warm-up finished in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()
+    yield
+    await async_engine.dispose()
+    await async_redis_pool.disconnect()
+    await async_pubsub_pool.disconnect()
+
 
 app = FastAPI(
     title="Gemini Backend Clone",
     description="A FastAPI backend system with chatrooms, AI integration, and subscription management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -24,6 +67,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and DB query metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(user.router)
@@ -40,6 +86,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 # Mount the static directory
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index, false
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -6,12 +6,24 @@ from app.database import Base
 
 class Chatroom(Base):
     __tablename__ = "chatrooms"
+    __table_args__ = (
+        # Keyset pagination over a user's chatrooms, by last activity or creation
+        Index("ix_chatrooms_user_id_last_activity_at", "user_id", "last_activity_at", "id"),
+        Index("ix_chatrooms_user_id_created_at", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String, nullable=False)
+    response_cache_bypass = Column(
+        Boolean, nullable=False, default=False, server_default=false())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Denormalized message stats, kept by the message path (ChatroomService)
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_preview = Column(String, nullable=True)
+    last_activity_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
     user = relationship("User", back_populates="chatrooms")
     messages = relationship("Message", back_populates="chatroom")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Text, Index, DDL, event, text, false
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -6,11 +6,82 @@ from app.database import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination over a chatroom's history
+        Index("ix_messages_chatroom_id_id", "chatroom_id", "id"),
+        # Messages still waiting for a response, for the recovery job
+        Index("ix_messages_pending_created_at", "created_at",
+              postgresql_where=text("awaiting_response"),
+              sqlite_where=text("awaiting_response")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     chatroom_id = Column(Integer, ForeignKey("chatrooms.id"), nullable=False)
     user_message = Column(Text, nullable=False)
     gemini_response = Column(Text, nullable=True)
+    # Set only for messages sent to Gemini, until their response is stored;
+    # imported history never is
+    awaiting_response = Column(Boolean, nullable=False, default=False, server_default=false())
+    # The response is an error message, not a model answer
+    response_failed = Column(Boolean, nullable=False, default=False, server_default=false())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     chatroom = relationship("Chatroom", back_populates="messages")
+
+
+# Full-text search objects, kept out of the mapped model: on Postgres a
+# weighted tsvector column maintained by a trigger, with a GIN index; on
+# SQLite an FTS5 table over messages maintained by triggers. Migration 0006
+# creates the same objects; these only apply to create_all (tests).
+SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE messages ADD COLUMN search_vector tsvector",
+        """
+        CREATE FUNCTION messages_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.user_message, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(NEW.gemini_response, '')), 'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER messages_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF user_message, gemini_response ON messages
+        FOR EACH ROW EXECUTE FUNCTION messages_search_vector_update()
+        """,
+        "CREATE INDEX ix_messages_search_vector ON messages USING gin (search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE messages_fts USING fts5(
+            user_message, gemini_response, content='messages', content_rowid='id')
+        """,
+        """
+        CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, user_message, gemini_response)
+            VALUES (new.id, new.user_message, new.gemini_response);
+        END
+        """,
+        """
+        CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, user_message, gemini_response)
+            VALUES ('delete', old.id, old.user_message, old.gemini_response);
+        END
+        """,
+        """
+        CREATE TRIGGER messages_fts_update AFTER UPDATE OF user_message, gemini_response ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, user_message, gemini_response)
+            VALUES ('delete', old.id, old.user_message, old.gemini_response);
+            INSERT INTO messages_fts(rowid, user_message, gemini_response)
+            VALUES (new.id, new.user_message, new.gemini_response);
+        END
+        """,
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Message.__table__, "after_create",
+                     DDL(statement).execute_if(dialect=dialect))
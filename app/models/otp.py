@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -6,6 +6,9 @@ from app.database import Base
 
 class OTP(Base):
     __tablename__ = "otps"
+    __table_args__ = (
+        Index("ix_otps_mobile_number_is_used", "mobile_number", "is_used"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     mobile_number = Column(String, nullable=False)
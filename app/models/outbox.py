@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class OutboxEntry(Base):
+    # A task to enqueue, written in the same transaction as the rows it
+    # refers to and deleted once the dispatcher has published it
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    task = Column(String, nullable=False)
+    args = Column(Text, nullable=False)
+    kwargs = Column(Text, nullable=False)
+    queue = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
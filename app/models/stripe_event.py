@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class StripeEvent(Base):
+    # One row per received webhook event, keyed by Stripe's event id so
+    # retried deliveries are recognised and processed only once
+    __tablename__ = "stripe_events"
+
+    id = Column(String, primary_key=True)
+    type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
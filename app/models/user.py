@@ -20,7 +20,10 @@ class User(Base):
         Enum(SubscriptionTier), default=SubscriptionTier.BASIC)
     daily_message_count = Column(Integer, default=0)
     last_message_date = Column(DateTime(timezone=True), nullable=True)
-    stripe_customer_id = Column(String, nullable=True)
+    stripe_customer_id = Column(String, nullable=True, index=True)
+    # Creation time of the last Stripe event applied to subscription_tier;
+    # events are delivered out of order and older ones are ignored
+    stripe_event_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
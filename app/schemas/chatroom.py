@@ -1,23 +1,47 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from enum import Enum
 from typing import List, Optional
 from .message import MessageResponse
 
 
 class ChatroomCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
+    response_cache_bypass: bool = False
+
+
+class ChatroomUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    response_cache_bypass: Optional[bool] = None
 
 
 class ChatroomResponse(BaseModel):
     id: int
     name: str
+    response_cache_bypass: bool = False
     created_at: datetime
     updated_at: Optional[datetime]
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
+    last_activity_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class ChatroomSort(str, Enum):
+    last_activity = "last_activity"
+    created = "created"
+
+
+class ChatroomPage(BaseModel):
+    # Newest first; pass next_before_id as before_id for the next page
+    chatrooms: List[ChatroomResponse]
+    next_before_id: Optional[int] = None
+
+
 class ChatroomDetail(ChatroomResponse):
+    # Latest page of messages; older ones via GET /chatroom/{id}/messages
     messages: List[MessageResponse] = []
+    next_before_id: Optional[int] = None
     model_config = {'from_attributes': True}
@@ -1,10 +1,12 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+
+USER_MESSAGE_MAX_LENGTH = 1000
 
 
 class MessageCreate(BaseModel):
-    user_message: str = Field(..., min_length=1, max_length=1000)
+    user_message: str = Field(..., min_length=1, max_length=USER_MESSAGE_MAX_LENGTH)
 
 
 class MessageResponse(BaseModel):
@@ -15,3 +17,29 @@ class MessageResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class MessageSearchResult(MessageResponse):
+    chatroom_id: int
+    rank: float
+
+
+class MessageSearchPage(BaseModel):
+    results: List[MessageSearchResult]
+    next_offset: Optional[int] = None
+
+
+class MessageImport(BaseModel):
+    user_message: str = Field(..., min_length=1, max_length=USER_MESSAGE_MAX_LENGTH)
+    gemini_response: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class MessageImportResult(BaseModel):
+    chatroom_id: int
+    imported: int
+
+
+class MessagePage(BaseModel):
+    messages: List[MessageResponse]
+    next_before_id: Optional[int] = None
@@ -0,0 +1,67 @@
+from typing import Optional
+from sqlalchemy import exists, func, select, tuple_, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select, Update
+from app.config import settings
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+
+
+class ChatroomService:
+    # Statements keeping the denormalized stats on chatrooms (message count,
+    # preview of the latest message, last activity) in step with messages.
+    # They run in the same transaction as the message write, from both the
+    # async API and the sync worker.
+
+    @staticmethod
+    def preview(text: str) -> str:
+        return text[:settings.chatroom_preview_length]
+
+    @staticmethod
+    def record_message(chatroom_id: int, user_message: str) -> Update:
+        return update(Chatroom).where(Chatroom.id == chatroom_id).values(
+            message_count=Chatroom.message_count + 1,
+            last_message_preview=ChatroomService.preview(user_message),
+            last_activity_at=func.now(),
+            updated_at=func.now()
+        )
+
+    @staticmethod
+    def record_response(chatroom_id: int, message_id: int, response: str) -> Update:
+        # Only while the message is still the chatroom's latest
+        newer = exists().where(Message.chatroom_id == chatroom_id, Message.id > message_id)
+        return update(Chatroom).where(Chatroom.id == chatroom_id, ~newer).values(
+            last_message_preview=ChatroomService.preview(response))
+
+    @staticmethod
+    def refresh_stats(chatroom_id: int) -> Update:
+        # Recomputed from the chatroom's messages, after bulk writes
+        in_chatroom = Message.chatroom_id == Chatroom.id
+        latest = select(func.substr(
+            func.coalesce(Message.gemini_response, Message.user_message),
+            1, settings.chatroom_preview_length
+        )).where(in_chatroom).order_by(Message.id.desc()).limit(1)
+        return update(Chatroom).where(Chatroom.id == chatroom_id).values(
+            message_count=select(func.count()).where(in_chatroom).scalar_subquery(),
+            last_message_preview=latest.scalar_subquery(),
+            last_activity_at=func.coalesce(
+                select(func.max(Message.created_at)).where(in_chatroom).scalar_subquery(),
+                Chatroom.created_at),
+            updated_at=func.now()
+        )
+
+    @staticmethod
+    def page_query(user_id: int, sort: str, before_id: Optional[int], limit: int) -> Select:
+        # Keyset pagination on (sort column, id), newest first. The cursor is
+        # the last chatroom of the previous page; its current sort value is
+        # read in the query, so a chatroom that becomes active again moves to
+        # the top and later pages repeat rows rather than skip them.
+        name = "last_activity_at" if sort == "last_activity" else "created_at"
+        column = getattr(Chatroom, name)
+        query = select(Chatroom).where(Chatroom.user_id == user_id)
+        if before_id is not None:
+            cursor = aliased(Chatroom)
+            position = select(getattr(cursor, name), cursor.id).where(
+                cursor.id == before_id, cursor.user_id == user_id)
+            query = query.where(tuple_(column, Chatroom.id) < position.scalar_subquery())
+        return query.order_by(column.desc(), Chatroom.id.desc()).limit(limit + 1)
@@ -0,0 +1,106 @@
+import json
+from typing import List
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.cache import redis_client
+from app.models.message import Message
+
+
+class ContextService:
+    # Each chatroom keeps a rolling window of its most recent turns in a
+    # Redis list, appended to as responses are stored. The database is only
+    # read (bounded by the window size) when the list is missing.
+
+    @staticmethod
+    def key(chatroom_id: int) -> str:
+        return f"chat_context:{chatroom_id}"
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # Roughly four characters per token for Gemini models
+        return max(1, len(text) // 4)
+
+    @staticmethod
+    def make_turn(role: str, text: str, message_id: int) -> dict:
+        return {"role": role, "text": text, "tokens": ContextService.estimate_tokens(text),
+                "message_id": message_id}
+
+    @staticmethod
+    def load_window(chatroom_id: int, before_message_id: int, db: Session) -> List[dict]:
+        key = ContextService.key(chatroom_id)
+        missing = True
+        try:
+            cached = redis_client.lrange(key, -settings.gemini_context_max_turns, -1)
+            if cached:
+                turns = [json.loads(turn) for turn in cached]
+                # The window ends at the newest processed message; a message
+                # processed out of order (requeued, retried) would see later
+                # turns, so it reads its own window from the database
+                newest = max(turn.get("message_id") or before_message_id for turn in turns)
+                if newest < before_message_id:
+                    return turns
+                missing = False
+        except Exception:
+            pass
+
+        exchanges = db.query(Message).filter(
+            Message.chatroom_id == chatroom_id,
+            Message.id < before_message_id,
+            Message.gemini_response.isnot(None),
+            Message.response_failed.is_(False)
+        ).order_by(Message.id.desc()).limit(settings.gemini_context_max_turns // 2).all()
+
+        turns = []
+        for message in reversed(exchanges):
+            turns.append(ContextService.make_turn("user", message.user_message, message.id))
+            turns.append(ContextService.make_turn("model", message.gemini_response, message.id))
+
+        # Only a missing window is rebuilt; an older one would hide later turns
+        if turns and missing:
+            try:
+                pipe = redis_client.pipeline()
+                pipe.delete(key)
+                pipe.rpush(key, *[json.dumps(turn) for turn in turns])
+                pipe.expire(key, settings.gemini_context_ttl_seconds)
+                pipe.execute()
+            except Exception:
+                pass
+        return turns
+
+    @staticmethod
+    def build_contents(turns: List[dict], user_message: str) -> List[dict]:
+        budget = settings.gemini_context_token_budget - \
+            ContextService.estimate_tokens(user_message)
+
+        # Walk back from the newest exchange, keeping user/model pairs
+        # together so roles keep alternating
+        selected = []
+        for i in range(len(turns) - 2, -1, -2):
+            user_turn, model_turn = turns[i], turns[i + 1]
+            if user_turn["role"] != "user" or model_turn["role"] != "model":
+                break
+            cost = user_turn["tokens"] + model_turn["tokens"]
+            if cost > budget:
+                break
+            budget -= cost
+            selected[:0] = [user_turn, model_turn]
+
+        contents = [{"role": turn["role"], "parts": [turn["text"]]}
+                    for turn in selected]
+        contents.append({"role": "user", "parts": [user_message]})
+        return contents
+
+    @staticmethod
+    def record_exchange(chatroom_id: int, message_id: int, user_message: str, response: str):
+        key = ContextService.key(chatroom_id)
+        try:
+            # RPUSHX only extends an existing window; a missing one is
+            # rebuilt from the database on the next load
+            pipe = redis_client.pipeline()
+            pipe.rpushx(key, json.dumps(ContextService.make_turn("user", user_message, message_id)))
+            pipe.rpushx(key, json.dumps(ContextService.make_turn("model", response, message_id)))
+            pipe.ltrim(key, -settings.gemini_context_max_turns, -1)
+            pipe.expire(key, settings.gemini_context_ttl_seconds)
+            pipe.execute()
+        except Exception:
+            pass
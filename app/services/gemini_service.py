@@ -1,17 +1,66 @@
-import google.generativeai as genai
+import asyncio
+import threading
+from typing import AsyncIterator, Iterator, List, Optional, Union
 from app.config import settings
 
-genai.configure(api_key=settings.gemini_api_key)
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    # The SDK is slow to import and only workers call it, so it is imported
+    # and configured on first use rather than when the API starts
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+
+            genai.configure(
+                api_key=settings.gemini_api_key,
+                transport=settings.gemini_transport,
+                client_options={"api_endpoint": settings.gemini_api_endpoint} if settings.gemini_api_endpoint else None
+            )
+            _genai = genai
+    return _genai
 
 
 class GeminiService:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-
-    def generate_response(self, message: str) -> str:
-        try:
-            response = self.model.generate_content(message)
-            print("Response in gemini service:", response.text)
-            return response.text
-        except Exception as e:
-            return f"Sorry, I couldn't process your request. Error: {str(e)}"
+        self.model = get_genai().GenerativeModel(settings.gemini_model_name)
+
+    def stream_response(self, contents: Union[str, List[dict]]) -> Iterator[str]:
+        # Errors are raised so callers can tell a failed generation apart
+        # from a real answer
+        response = self.model.generate_content(contents, stream=True)
+        for chunk in response:
+            yield chunk.text
+
+    async def stream_response_async(self, contents: Union[str, List[dict]]) -> AsyncIterator[str]:
+        if settings.gemini_transport == "rest":
+            # The SDK has no asyncio REST transport; drive the blocking
+            # stream from a thread instead
+            iterator = self.stream_response(contents)
+            done = object()
+            while (chunk := await asyncio.to_thread(next, iterator, done)) is not done:
+                yield chunk
+            return
+
+        response = await self.model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+    @staticmethod
+    def error_message(error: Exception) -> str:
+        return f"Sorry, I couldn't process your request. Error: {str(error)}"
+
+
+_gemini_service: Optional[GeminiService] = None
+
+
+def get_gemini_service() -> GeminiService:
+    # One model instance per process, so its API client and connections
+    # are reused across tasks
+    global _gemini_service
+    if _gemini_service is None:
+        _gemini_service = GeminiService()
+    return _gemini_service
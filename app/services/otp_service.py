@@ -1,46 +1,128 @@
 import random
 import string
+from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.cache import async_redis_client
 from app.models.otp import OTP
 from app.models.user import User
 
 
-class OTPService:
-    @staticmethod
-    def generate_otp() -> str:
-        return ''.join(random.choices(string.digits, k=6))
+class OTPBackend(ABC):
+    @abstractmethod
+    async def store(self, mobile_number: str, otp_code: str, db: AsyncSession):
+        ...
+
+    @abstractmethod
+    async def consume(self, mobile_number: str, otp_code: str, db: AsyncSession) -> bool:
+        ...
+
+
+class RedisOTPBackend(OTPBackend):
+    # One hash per mobile number ({code, attempts}) expiring with the OTP.
+    # Sending a new OTP overwrites the old one, and a wrong guess counts an
+    # attempt; the OTP is dropped once OTP_MAX_ATTEMPTS is reached.
+    CONSUME_SCRIPT = """
+    local code = redis.call('HGET', KEYS[1], 'code')
+    if not code then
+        return 0
+    end
+    if code == ARGV[1] then
+        redis.call('DEL', KEYS[1])
+        return 1
+    end
+    if redis.call('HINCRBY', KEYS[1], 'attempts', 1) >= tonumber(ARGV[2]) then
+        redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.consume_script = redis_client.register_script(self.CONSUME_SCRIPT)
 
     @staticmethod
-    def create_otp(mobile_number: str, db: Session) -> str:
-        # Invalidate any existing OTPs for this mobile number
-        db.query(OTP).filter(OTP.mobile_number ==
-                             mobile_number).update({"is_used": True})
+    def key(mobile_number: str) -> str:
+        return f"otp:{mobile_number}"
 
-        otp_code = OTPService.generate_otp()
-        expires_at = datetime.now() + timedelta(minutes=10)
+    async def store(self, mobile_number: str, otp_code: str, db: AsyncSession):
+        key = self.key(mobile_number)
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={"code": otp_code, "attempts": 0})
+        pipe.expire(key, settings.otp_ttl_seconds)
+        await pipe.execute()
 
-        otp = OTP(
-            mobile_number=mobile_number,
-            otp_code=otp_code,
-            expires_at=expires_at
+    async def consume(self, mobile_number: str, otp_code: str, db: AsyncSession) -> bool:
+        result = await self.consume_script(
+            keys=[self.key(mobile_number)],
+            args=[otp_code, settings.otp_max_attempts]
         )
-        db.add(otp)
-        db.commit()
+        return result == 1
 
-        return otp_code
 
-    @staticmethod
-    def verify_otp(mobile_number: str, otp_code: str, db: Session) -> bool:
-        otp = db.query(OTP).filter(
+class DatabaseOTPBackend(OTPBackend):
+    # Rows are looked up through ix_otps_mobile_number_is_used and removed
+    # by the periodic purge_expired_otps task
+
+    async def store(self, mobile_number: str, otp_code: str, db: AsyncSession):
+        # Invalidate any existing OTPs for this mobile number
+        await db.execute(update(OTP).where(
+            OTP.mobile_number == mobile_number,
+            OTP.is_used == False
+        ).values(is_used=True))
+
+        db.add(OTP(
+            mobile_number=mobile_number,
+            otp_code=otp_code,
+            expires_at=datetime.now() + timedelta(seconds=settings.otp_ttl_seconds)
+        ))
+        await db.commit()
+
+    async def consume(self, mobile_number: str, otp_code: str, db: AsyncSession) -> bool:
+        # A single conditional UPDATE, so an OTP can only be used once
+        result = await db.execute(update(OTP).where(
             OTP.mobile_number == mobile_number,
-            OTP.otp_code == otp_code,
             OTP.is_used == False,
+            OTP.otp_code == otp_code,
             OTP.expires_at > datetime.now()
-        ).first()
+        ).values(is_used=True))
+        await db.commit()
+        return result.rowcount > 0
+
+    @staticmethod
+    def purge(db: Session) -> int:
+        result = db.execute(delete(OTP).where(or_(
+            OTP.is_used == True,
+            OTP.expires_at < datetime.now()
+        )))
+        db.commit()
+        return result.rowcount
+
+
+def get_otp_backend() -> OTPBackend:
+    if settings.otp_backend == "redis":
+        return RedisOTPBackend(async_redis_client)
+    return DatabaseOTPBackend()
+
+
+otp_backend = get_otp_backend()
+
 
-        if otp:
-            otp.is_used = True
-            db.commit()
-            return True
-        return False
+class OTPService:
+    @staticmethod
+    def generate_otp() -> str:
+        return ''.join(random.choices(string.digits, k=6))
+
+    @staticmethod
+    async def create_otp(mobile_number: str, db: AsyncSession) -> str:
+        otp_code = OTPService.generate_otp()
+        await otp_backend.store(mobile_number, otp_code, db)
+        return otp_code
+
+    @staticmethod
+    async def verify_otp(mobile_number: str, otp_code: str, db: AsyncSession) -> bool:
+        return await otp_backend.consume(mobile_number, otp_code, db)
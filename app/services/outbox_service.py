@@ -0,0 +1,45 @@
+import json
+from typing import Union
+from celery import Celery
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.outbox import OutboxEntry
+
+
+class OutboxService:
+    # Tasks are added to the outbox in the caller's transaction, so they
+    # exist exactly when the rows they refer to do, and published later by
+    # the dispatcher (app/tasks/outbox_dispatcher.py). Publishing is at
+    # least once: tasks must tolerate running twice.
+
+    @staticmethod
+    def add(db: Union[Session, AsyncSession], task: str, args: list, kwargs: dict,
+            queue: str) -> OutboxEntry:
+        entry = OutboxEntry(task=task, args=json.dumps(args),
+                            kwargs=json.dumps(kwargs), queue=queue)
+        db.add(entry)
+        return entry
+
+    @staticmethod
+    def dispatch(db: Session, app: Celery, limit: int) -> int:
+        # SKIP LOCKED lets several dispatchers drain the outbox side by side.
+        # Published entries are deleted in the claiming transaction; if
+        # publishing fails part way, the rest stay for the next pass.
+        entries = db.scalars(select(OutboxEntry).order_by(OutboxEntry.id).limit(
+            limit).with_for_update(skip_locked=True)).all()
+        sent = []
+        try:
+            for entry in entries:
+                # send_task doesn't read the task's ignore_result, and would
+                # otherwise wait on the result backend for every task
+                task = app.tasks.get(entry.task)
+                ignore_result = task.ignore_result if task else app.conf.task_ignore_result
+                app.send_task(entry.task, json.loads(entry.args), json.loads(entry.kwargs),
+                              queue=entry.queue, ignore_result=ignore_result)
+                sent.append(entry.id)
+        finally:
+            if sent:
+                db.execute(delete(OutboxEntry).where(OutboxEntry.id.in_(sent)))
+            db.commit()
+        return len(sent)
@@ -0,0 +1,143 @@
+import logging
+import time
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import Boolean, Integer, Text, column, exists, update, values
+from sqlalchemy.orm import Session, aliased
+from app.config import settings
+from app.core.cache import invalidate_sync, redis_client
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.services.chatroom_service import ChatroomService
+
+logger = logging.getLogger(__name__)
+
+Entry = Tuple[bytes, Dict[bytes, bytes]]
+
+
+class ResponseWriteService:
+    # Write-behind for Gemini responses (RESPONSE_WRITE_MODE=stream): workers
+    # append them to a Redis stream and the flusher
+    # (app/tasks/response_flusher.py) applies them a batch per transaction.
+    # Entries are acknowledged only after their batch commits, so a crashed
+    # flusher leaves them pending for the next start. Until then a
+    # response_queued:{message_id} key tells the recovery job the response
+    # exists.
+
+    @staticmethod
+    def queued_key(message_id: int) -> str:
+        return f"response_queued:{message_id}"
+
+    @staticmethod
+    def push(message_id: int, chatroom_id: int, user_id: int, response: str,
+             failed: bool = False) -> bool:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.xadd(settings.response_stream_key, {
+                "message_id": message_id,
+                "chatroom_id": chatroom_id,
+                "user_id": user_id,
+                "response": response,
+                "failed": int(failed),
+            })
+            pipe.set(ResponseWriteService.queued_key(message_id), 1,
+                     ex=settings.message_recovery_max_age_seconds)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning("Response stream write failed for message %s: %s", message_id, e)
+            return False
+
+    @staticmethod
+    def queued(message_ids: Iterable[int]) -> Set[int]:
+        message_ids = list(message_ids)
+        if not message_ids:
+            return set()
+        found = redis_client.mget([ResponseWriteService.queued_key(m) for m in message_ids])
+        return {m for m, value in zip(message_ids, found) if value is not None}
+
+    @staticmethod
+    def ensure_group():
+        try:
+            redis_client.xgroup_create(settings.response_stream_key,
+                                       settings.response_stream_group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def read(count: int, block_ms: int, pending: bool = False) -> List[Entry]:
+        # pending=True re-reads entries delivered to this flusher but never
+        # acknowledged
+        streams = redis_client.xreadgroup(
+            settings.response_stream_group, settings.response_flusher_name,
+            {settings.response_stream_key: "0" if pending else ">"},
+            count=count, block=None if pending else block_ms)
+        return streams[0][1] if streams else []
+
+    @staticmethod
+    def read_batch(batch_size: int, max_latency_ms: int) -> List[Entry]:
+        # Waits for a first entry, then keeps reading until the batch is full
+        # or max_latency_ms have passed since it arrived
+        entries = ResponseWriteService.read(batch_size, max_latency_ms)
+        deadline = time.monotonic() + max_latency_ms / 1000
+        while entries and len(entries) < batch_size:
+            remaining = int((deadline - time.monotonic()) * 1000)
+            if remaining <= 0:
+                break
+            entries += ResponseWriteService.read(batch_size - len(entries), remaining)
+        return entries
+
+    @staticmethod
+    def apply(db: Session, entries: List[Entry]):
+        responses = {}
+        for _, fields in entries:
+            responses[int(fields[b"message_id"])] = (
+                int(fields[b"chatroom_id"]), int(fields[b"user_id"]), fields[b"response"].decode(),
+                fields.get(b"failed") == b"1")
+        rows = [{"message_id": message_id, "response": response, "failed": failed}
+                for message_id, (_, _, response, failed) in responses.items()]
+        # The latest message per chatroom sets its preview
+        latest = {}
+        for message_id, (chatroom_id, _, response, _) in sorted(responses.items()):
+            latest[chatroom_id] = (message_id, ChatroomService.preview(response))
+
+        if db.bind.dialect.name == "postgresql":
+            batch = values(column("message_id", Integer), column("response", Text),
+                           column("failed", Boolean), name="batch").data(
+                [(r["message_id"], r["response"], r["failed"]) for r in rows])
+            db.execute(update(Message).where(Message.id == batch.c.message_id).values(
+                gemini_response=batch.c.response, response_failed=batch.c.failed,
+                awaiting_response=False).execution_options(synchronize_session=False))
+
+            previews = values(column("chatroom_id", Integer), column("message_id", Integer),
+                              column("preview", Text), name="previews").data(
+                [(chatroom_id, *latest[chatroom_id]) for chatroom_id in latest])
+            newer = aliased(Message)
+            db.execute(update(Chatroom).where(
+                Chatroom.id == previews.c.chatroom_id,
+                ~exists().where(newer.chatroom_id == previews.c.chatroom_id,
+                                newer.id > previews.c.message_id)
+            ).values(last_message_preview=previews.c.preview).execution_options(
+                synchronize_session=False))
+        else:
+            # No UPDATE ... FROM (VALUES ...): one executemany by primary key
+            db.execute(update(Message), [
+                {"id": r["message_id"], "gemini_response": r["response"],
+                 "response_failed": r["failed"], "awaiting_response": False} for r in rows])
+            for chatroom_id, (message_id, preview) in latest.items():
+                db.execute(ChatroomService.record_response(chatroom_id, message_id, preview))
+        db.commit()
+
+        # Cached chatroom details include the messages, and the lists their previews
+        invalidate_sync(*{("chatrooms", user_id) for _, user_id, _, _ in responses.values()},
+                        *{("chatroom", chatroom_id) for chatroom_id, _, _, _ in responses.values()})
+
+    @staticmethod
+    def ack(entries: List[Entry]):
+        ids = [entry_id for entry_id, _ in entries]
+        pipe = redis_client.pipeline()
+        pipe.xack(settings.response_stream_key, settings.response_stream_group, *ids)
+        pipe.xdel(settings.response_stream_key, *ids)
+        pipe.delete(*{ResponseWriteService.queued_key(int(fields[b"message_id"]))
+                      for _, fields in entries})
+        pipe.execute()
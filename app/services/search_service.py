@@ -0,0 +1,55 @@
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import column, func, literal_column, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+
+# Must match the configuration the search_vector trigger uses (migration 0006)
+SEARCH_CONFIG = "english"
+
+messages_fts = table("messages_fts", column("rowid"))
+
+
+class SearchService:
+    # Ranked full-text search over one user's messages. Postgres matches the
+    # GIN-indexed search_vector column; SQLite (local development and tests)
+    # falls back to the messages_fts FTS5 table. Only the user's chatrooms
+    # are searched, and only the requested page of rows is loaded.
+
+    @staticmethod
+    def fts5_query(query: str) -> Optional[str]:
+        # Every word as a quoted string (all must match), so user input is
+        # never parsed as FTS5 query syntax
+        words = re.findall(r"\w+", query)
+        return " ".join(f'"{word}"' for word in words) or None
+
+    @staticmethod
+    async def search(db: AsyncSession, user_id: int, query: str,
+                     limit: int, offset: int) -> List[Tuple[Message, float]]:
+        user_chatrooms = select(Chatroom.id).where(Chatroom.user_id == user_id)
+
+        if db.bind.dialect.name == "postgresql":
+            config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+            tsquery = func.websearch_to_tsquery(config, query)
+            search_vector = literal_column("messages.search_vector")
+            rank = func.ts_rank_cd(search_vector, tsquery)
+            statement = select(Message, rank.label("rank")).where(
+                Message.chatroom_id.in_(user_chatrooms),
+                search_vector.op("@@")(tsquery)
+            ).order_by(rank.desc(), Message.id.desc())
+        else:
+            match = SearchService.fts5_query(query)
+            if match is None:
+                return []
+            # bm25 is lower for better matches; user_message weighs double
+            bm25 = literal_column("bm25(messages_fts, 2.0, 1.0)")
+            statement = select(Message, (-bm25).label("rank")).join(
+                messages_fts, messages_fts.c.rowid == Message.id
+            ).where(
+                Message.chatroom_id.in_(user_chatrooms),
+                literal_column("messages_fts").op("MATCH")(match)
+            ).order_by(bm25, Message.id.desc())
+
+        rows = await db.execute(statement.limit(limit).offset(offset))
+        return [(message, rank) for message, rank in rows.all()]
@@ -0,0 +1,77 @@
+import json
+import time
+from typing import AsyncIterator
+from app.core.cache import redis_client, async_redis_client, async_pubsub_client
+from app.config import settings
+
+
+class StreamService:
+    # Events are both published and appended to a short-lived buffer, so a
+    # listener that subscribes late replays the buffer and uses `seq` to
+    # skip duplicates delivered through pub/sub.
+
+    @staticmethod
+    def channel(message_id: int) -> str:
+        return f"message_stream:{message_id}"
+
+    @staticmethod
+    def buffer_key(message_id: int) -> str:
+        return f"message_stream:{message_id}:events"
+
+    @staticmethod
+    def _publish(message_id: int, event: dict):
+        data = json.dumps(event)
+        buffer_key = StreamService.buffer_key(message_id)
+        try:
+            pipe = redis_client.pipeline()
+            pipe.rpush(buffer_key, data)
+            pipe.expire(buffer_key, settings.stream_buffer_ttl_seconds)
+            pipe.publish(StreamService.channel(message_id), data)
+            pipe.execute()
+        except Exception:
+            pass
+
+    @staticmethod
+    def publish_chunk(message_id: int, seq: int, text: str):
+        StreamService._publish(
+            message_id, {"seq": seq, "type": "chunk", "text": text})
+
+    @staticmethod
+    def publish_done(message_id: int, seq: int):
+        StreamService._publish(message_id, {"seq": seq, "type": "done"})
+
+    @staticmethod
+    async def listen(message_id: int) -> AsyncIterator[dict]:
+        pubsub = async_pubsub_client.pubsub()
+        await pubsub.subscribe(StreamService.channel(message_id))
+        try:
+            next_seq = 0
+            buffered = await async_redis_client.lrange(
+                StreamService.buffer_key(message_id), 0, -1)
+            for raw in buffered:
+                event = json.loads(raw)
+                next_seq = event["seq"] + 1
+                yield event
+                if event["type"] == "done":
+                    return
+
+            last_event_at = time.monotonic()
+            while time.monotonic() - last_event_at < settings.stream_idle_timeout_seconds:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+
+                event = json.loads(message["data"])
+                if event["seq"] < next_seq:
+                    continue
+                next_seq = event["seq"] + 1
+                last_event_at = time.monotonic()
+                yield event
+                if event["type"] == "done":
+                    return
+
+            yield {"seq": next_seq, "type": "timeout"}
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
@@ -1,27 +1,95 @@
-import stripe
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from app.config import settings
+from app.models.user import SubscriptionTier
 
-stripe.api_key = settings.stripe_secret_key
+_stripe = None
+_stripe_lock = threading.Lock()
+
+
+def get_stripe():
+    # The SDK is slow to import, so it is imported and configured on first
+    # use rather than when the API starts
+    global _stripe
+    with _stripe_lock:
+        if _stripe is None:
+            import stripe
+
+            stripe.api_key = settings.stripe_secret_key
+            if settings.stripe_api_base:
+                stripe.api_base = settings.stripe_api_base
+            # Connection errors, 409s and 5xx are retried by the SDK with backoff
+            stripe.max_network_retries = settings.stripe_max_network_retries
+            # Each thread keeps its own requests session, so connections are reused
+            stripe.default_http_client = stripe.http_client.RequestsClient(
+                timeout=settings.stripe_timeout_seconds)
+            _stripe = stripe
+    return _stripe
+
+
+# The SDK is blocking; async callers run it on this pool
+stripe_executor = ThreadPoolExecutor(
+    max_workers=settings.stripe_workers, thread_name_prefix="stripe")
+
+PRO_PRODUCT_NAME = "Gemini Pro Subscription"
+PRO_PRICE_AMOUNT = 999  # $9.99 in cents
+
+# Subscription statuses that keep or lose Pro access; others (e.g.
+# past_due while Stripe retries the payment) leave the tier unchanged
+ACTIVE_SUBSCRIPTION_STATUSES = {"active", "trialing"}
+ENDED_SUBSCRIPTION_STATUSES = {"canceled", "unpaid", "incomplete_expired"}
+
+_pro_price_id: Optional[str] = settings.stripe_pro_price_id
+_pro_price_lock = threading.Lock()
 
 
 class StripeService:
+    @staticmethod
+    def tier_for_event(event_type: str, data: dict) -> Optional[SubscriptionTier]:
+        # The tier a customer should be on after this event, if it changes it
+        if event_type in ("checkout.session.completed", "invoice.paid"):
+            return SubscriptionTier.PRO
+        if event_type == "customer.subscription.deleted":
+            return SubscriptionTier.BASIC
+        if event_type == "customer.subscription.updated":
+            if data.get("status") in ACTIVE_SUBSCRIPTION_STATUSES:
+                return SubscriptionTier.PRO
+            if data.get("status") in ENDED_SUBSCRIPTION_STATUSES:
+                return SubscriptionTier.BASIC
+        return None
+
+    @staticmethod
+    def get_pro_price_id() -> str:
+        # The Pro price is looked up by lookup key (created on first use)
+        # once per process instead of sending inline price_data every time
+        global _pro_price_id
+        with _pro_price_lock:
+            if _pro_price_id is None:
+                lookup_key = settings.stripe_pro_price_lookup_key
+                stripe = get_stripe()
+                prices = stripe.Price.list(lookup_keys=[lookup_key], active=True, limit=1)
+                if prices.data:
+                    _pro_price_id = prices.data[0].id
+                else:
+                    _pro_price_id = stripe.Price.create(
+                        currency='usd',
+                        unit_amount=PRO_PRICE_AMOUNT,
+                        recurring={'interval': 'month'},
+                        product_data={'name': PRO_PRODUCT_NAME},
+                        lookup_key=lookup_key,
+                    ).id
+            return _pro_price_id
+
     @staticmethod
     def create_checkout_session(customer_email: str = None, customer_id: str = None):
 
         try:
-            session = stripe.checkout.Session.create(
+            session = get_stripe().checkout.Session.create(
                 payment_method_types=['card'],
                 line_items=[{
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': 'Gemini Pro Subscription',
-                        },
-                        'unit_amount': 999,  # $9.99 in cents
-                        'recurring': {
-                            'interval': 'month',
-                        },
-                    },
+                    'price': StripeService.get_pro_price_id(),
                     'quantity': 1,
                 }],
                 mode='subscription',
@@ -38,7 +106,7 @@ class StripeService:
     @staticmethod
     def create_customer(email: str, name: str = None):
         try:
-            customer = stripe.Customer.create(
+            customer = get_stripe().Customer.create(
                 email=email,
                 name=name
             )
@@ -46,3 +114,15 @@ class StripeService:
         except Exception as e:
             print("Error creating customer:", e)
             raise Exception(f"Stripe error: {str(e)}")
+
+    @staticmethod
+    async def create_checkout_session_async(customer_email: str = None, customer_id: str = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            stripe_executor, StripeService.create_checkout_session, customer_email, customer_id)
+
+    @staticmethod
+    async def create_customer_async(email: str, name: str = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            stripe_executor, StripeService.create_customer, email, name)
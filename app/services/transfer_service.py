@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.message import Message
+from app.schemas.message import MessageImport
+
+
+class TransferError(ValueError):
+    def __init__(self, line: int, reason: str):
+        super().__init__(f"Line {line}: {reason}")
+        self.line = line
+
+
+class TransferService:
+    # NDJSON import/export of a chatroom's messages, one message per line.
+    # Neither direction holds more than one batch of rows in memory.
+
+    @staticmethod
+    async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        # A line longer than TRANSFER_MAX_LINE_BYTES is rejected as soon as
+        # it is, rather than buffered until its newline
+        buffer = b""
+        line_number = 0
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if len(line) > settings.transfer_max_line_bytes:
+                    raise TransferError(line_number, "line too long")
+                yield line
+            if len(buffer) > settings.transfer_max_line_bytes:
+                raise TransferError(line_number + 1, "line too long")
+        yield buffer
+
+    @staticmethod
+    async def import_messages(db: AsyncSession, chatroom_id: int,
+                              chunks: AsyncIterator[bytes]) -> int:
+        # Rows go out in multi-row INSERT batches inside the caller's
+        # transaction, so an invalid line leaves nothing imported
+        batch = []
+        imported = 0
+        line_number = 0
+        now = datetime.now(timezone.utc)
+        async for line in TransferService.iter_lines(chunks):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                message = MessageImport.model_validate_json(line)
+            except ValidationError as e:
+                raise TransferError(line_number, str(e.errors()[0]["msg"]))
+
+            batch.append({
+                "chatroom_id": chatroom_id,
+                "user_message": message.user_message,
+                "gemini_response": message.gemini_response,
+                "created_at": message.created_at or now,
+            })
+            if len(batch) >= settings.transfer_batch_size:
+                await db.execute(insert(Message), batch)
+                imported += len(batch)
+                batch = []
+
+        if batch:
+            await db.execute(insert(Message), batch)
+            imported += len(batch)
+        return imported
+
+    @staticmethod
+    async def export_messages(chatroom_id: int) -> AsyncIterator[bytes]:
+        # Uses its own session, as the response outlives the request's, and
+        # streams rows through a server-side cursor in batches
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                select(Message.id, Message.user_message, Message.gemini_response,
+                       Message.created_at)
+                .where(Message.chatroom_id == chatroom_id)
+                .order_by(Message.id)
+                .execution_options(yield_per=settings.transfer_batch_size))
+            async for rows in result.mappings().partitions():
+                yield b"".join(TransferService.format_lines(rows))
+
+    @staticmethod
+    def format_lines(rows) -> Iterator[bytes]:
+        for row in rows:
+            yield orjson.dumps(dict(row)) + b"\n"
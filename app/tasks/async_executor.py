@@ -0,0 +1,182 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from celery.utils.log import get_task_logger
+from google.api_core import exceptions as google_exceptions
+from app.config import settings
+from app.core.cache import response_cache
+from app.services.gemini_service import GeminiService, get_gemini_service
+from app.services.stream_service import StreamService
+from app.tasks.gemini_pipeline import (
+    PreparedMessage, prepare_message, store_response, log_timings, record_metrics)
+
+logger = get_task_logger(__name__)
+
+# 429s and 5xx from the model API are worth retrying
+RETRYABLE_ERRORS = (google_exceptions.TooManyRequests,
+                    google_exceptions.ServerError)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_delay(attempt: int) -> float:
+    # Exponential backoff with full jitter
+    cap = min(settings.gemini_retry_max_delay,
+              settings.gemini_retry_base_delay * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+class AsyncGeminiExecutor:
+    # Runs many generations concurrently in one worker process on an event
+    # loop in a background thread. Celery tasks hand messages over with
+    # submit(), which blocks while all concurrency slots are busy so the
+    # worker stops pulling from the broker when saturated.
+
+    def __init__(self, concurrency: int, qps: Optional[float] = None):
+        self.concurrency = concurrency
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.qps = qps
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.loop = asyncio.new_event_loop()
+        # DB and Redis steps are blocking and run on this pool
+        self.loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="gemini-io"))
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="gemini-async", daemon=True)
+        self.thread.start()
+
+    def submit(self, message_id: int) -> Future:
+        self.slots.acquire()
+        future = asyncio.run_coroutine_threadsafe(
+            self.process(message_id), self.loop)
+        future.add_done_callback(lambda f: self.finished(message_id, f))
+        return future
+
+    def finished(self, message_id: int, future: Future):
+        self.slots.release()
+        # Nothing waits on the future, so this is the only place an
+        # unexpected error (DB, Redis) would show up
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Async processing of message %s failed", message_id,
+                         exc_info=future.exception())
+
+    def shutdown(self, timeout: float = 30):
+        # Taking every slot means all in-flight messages have finished
+        deadline = time.monotonic() + timeout
+        taken = 0
+        while taken < self.concurrency:
+            if not self.slots.acquire(timeout=max(0, deadline - time.monotonic())):
+                break
+            taken += 1
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+    def bucket(self, api_key: str) -> Optional[TokenBucket]:
+        if not self.qps:
+            return None
+        if api_key not in self.buckets:
+            self.buckets[api_key] = TokenBucket(
+                self.qps, burst=max(1, int(self.qps)))
+        return self.buckets[api_key]
+
+    async def process(self, message_id: int) -> Optional[str]:
+        started = time.perf_counter()
+        prepared = await asyncio.to_thread(prepare_message, message_id)
+        if prepared is None:
+            return None
+        setup_done = time.perf_counter()
+
+        response, chunk_count = await self.generate(prepared)
+        generation_done = time.perf_counter()
+
+        await asyncio.to_thread(store_response, prepared, response, chunk_count)
+        log_timings(message_id, started, setup_done,
+                    generation_done, time.perf_counter())
+        return response
+
+    async def generate(self, prepared: PreparedMessage) -> Tuple[str, int]:
+        started = time.perf_counter()
+        if prepared.cached_response is not None:
+            await asyncio.to_thread(
+                StreamService.publish_chunk, prepared.message_id, 0, prepared.cached_response)
+            record_metrics(prepared, "async", "cached",
+                           started, prepared.cached_response)
+            return prepared.cached_response, 1
+
+        chunks = []
+        bucket = self.bucket(settings.gemini_api_key)
+        for attempt in range(settings.gemini_max_retries + 1):
+            if bucket:
+                await bucket.acquire()
+            try:
+                async for chunk in get_gemini_service().stream_response_async(prepared.contents):
+                    # Publishing uses the blocking Redis client; on the loop
+                    # one slow round trip would stall every generation
+                    await asyncio.to_thread(
+                        StreamService.publish_chunk, prepared.message_id, len(chunks), chunk)
+                    chunks.append(chunk)
+                response = "".join(chunks)
+                record_metrics(prepared, "async", "success", started, response)
+                if prepared.cache_key:
+                    await asyncio.to_thread(response_cache.set, prepared.cache_key, response)
+                return response, len(chunks)
+            except RETRYABLE_ERRORS as e:
+                error = e
+                # Once tokens have reached listeners the attempt can't be redone
+                if chunks or attempt == settings.gemini_max_retries:
+                    break
+                await asyncio.sleep(retry_delay(attempt))
+            except Exception as e:
+                error = e
+                break
+
+        record_metrics(prepared, "async", "error", started, "".join(chunks))
+        prepared.failed = True
+        message = GeminiService.error_message(error)
+        await asyncio.to_thread(
+            StreamService.publish_chunk, prepared.message_id, len(chunks), message)
+        chunks.append(message)
+        return "".join(chunks), len(chunks)
+
+
+_executor: Optional[AsyncGeminiExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_async_executor() -> AsyncGeminiExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = AsyncGeminiExecutor(
+                settings.gemini_async_concurrency, settings.gemini_qps_per_key)
+        return _executor
+
+
+def shutdown_async_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
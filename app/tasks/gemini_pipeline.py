@@ -0,0 +1,147 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from celery.utils.log import get_task_logger
+from app.config import settings
+from app.core.cache import invalidate_sync, response_cache
+from app.core.metrics import record_generation
+from app.database import SessionLocal
+from app.models import user, otp  # noqa: F401
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.services.chatroom_service import ChatroomService
+from app.services.context_service import ContextService
+from app.services.gemini_service import GeminiService, get_gemini_service
+from app.services.response_write_service import ResponseWriteService
+from app.services.stream_service import StreamService
+
+# Steps shared by the sync Celery task and the async executor:
+# prepare (DB + context + cache lookup), generate, store.
+
+logger = get_task_logger(__name__)
+
+
+@dataclass
+class PreparedMessage:
+    message_id: int
+    chatroom_id: int
+    user_id: int
+    user_message: str
+    contents: List[dict]
+    cache_key: Optional[str] = None
+    cached_response: Optional[str] = None
+    prompt_tokens: int = 0
+    # Set when generation failed and the response is an error message
+    failed: bool = False
+
+
+def prepare_message(message_id: int) -> Optional[PreparedMessage]:
+    db = SessionLocal()
+    try:
+        row = db.query(Message.user_message, Message.gemini_response, Chatroom).join(
+            Chatroom).filter(Message.id == message_id).first()
+        # Tasks can be delivered more than once (outbox, recovery); a message
+        # that already has its response is done
+        if not row or row.gemini_response is not None:
+            return None
+        user_message, _, chatroom = row
+
+        # Send recent chatroom history along with the new message
+        turns = ContextService.load_window(chatroom.id, message_id, db)
+        contents = ContextService.build_contents(turns, user_message)
+
+        cache_key = None
+        if settings.response_cache_enabled and not chatroom.response_cache_bypass:
+            cache_key = response_cache.key(
+                user_message, settings.gemini_model_name, contents[:-1])
+    finally:
+        db.close()
+
+    return PreparedMessage(
+        message_id=message_id,
+        chatroom_id=chatroom.id,
+        user_id=chatroom.user_id,
+        user_message=user_message,
+        contents=contents,
+        cache_key=cache_key,
+        cached_response=response_cache.get(cache_key) if cache_key else None,
+        prompt_tokens=sum(ContextService.estimate_tokens(part)
+                          for content in contents for part in content["parts"])
+    )
+
+
+def generate_response(prepared: PreparedMessage) -> Tuple[str, int]:
+    started = time.perf_counter()
+    if prepared.cached_response is not None:
+        StreamService.publish_chunk(prepared.message_id, 0, prepared.cached_response)
+        record_metrics(prepared, "sync", "cached", started, prepared.cached_response)
+        return prepared.cached_response, 1
+
+    # Push tokens to listeners as they are generated
+    chunks = []
+    try:
+        for chunk in get_gemini_service().stream_response(prepared.contents):
+            StreamService.publish_chunk(prepared.message_id, len(chunks), chunk)
+            chunks.append(chunk)
+        response = "".join(chunks)
+        record_metrics(prepared, "sync", "success", started, response)
+        if prepared.cache_key:
+            response_cache.set(prepared.cache_key, response)
+    except Exception as e:
+        record_metrics(prepared, "sync", "error", started, "".join(chunks))
+        prepared.failed = True
+        error = GeminiService.error_message(e)
+        StreamService.publish_chunk(prepared.message_id, len(chunks), error)
+        chunks.append(error)
+        response = "".join(chunks)
+    return response, len(chunks)
+
+
+def record_metrics(prepared: PreparedMessage, mode: str, result: str,
+                   started: float, response: str):
+    # The SDK doesn't report usage, so token counts are estimates. Cached
+    # responses never reach the model and count no tokens.
+    called = result != "cached"
+    record_generation(
+        mode, result, time.perf_counter() - started,
+        prepared.prompt_tokens if called else 0,
+        ContextService.estimate_tokens(response) if called and response else 0)
+
+
+def store_response(prepared: PreparedMessage, response: str, chunk_count: int):
+    # In stream mode the flusher writes the response (and invalidates the
+    # cache) with others in one batch; if the stream can't be written to,
+    # the response is written here as usual
+    queued = settings.response_write_mode == "stream" and ResponseWriteService.push(
+        prepared.message_id, prepared.chatroom_id, prepared.user_id, response, prepared.failed)
+    if not queued:
+        db = SessionLocal()
+        try:
+            db.query(Message).filter(Message.id == prepared.message_id).update(
+                {"gemini_response": response, "awaiting_response": False,
+                 "response_failed": prepared.failed})
+            db.execute(ChatroomService.record_response(
+                prepared.chatroom_id, prepared.message_id, response))
+            db.commit()
+        finally:
+            db.close()
+
+        # Cached chatroom details include the message, and the list its preview
+        invalidate_sync(("chatrooms", prepared.user_id), ("chatroom", prepared.chatroom_id))
+    # An error message is no model turn; it would be sent back to Gemini
+    # with every later message in the chatroom
+    if not prepared.failed:
+        ContextService.record_exchange(
+            prepared.chatroom_id, prepared.message_id, prepared.user_message, response)
+    StreamService.publish_done(prepared.message_id, chunk_count)
+
+
+def log_timings(message_id: int, started: float, setup_done: float,
+                generation_done: float, write_done: float):
+    logger.info(
+        "Message %s processed: setup=%.1fms generation=%.1fms db_write=%.1fms",
+        message_id,
+        (setup_done - started) * 1000,
+        (generation_done - setup_done) * 1000,
+        (write_done - generation_done) * 1000,
+    )
@@ -1,34 +1,135 @@
+import os
+import time
+from typing import Optional
 from celery import Celery
-from app.services.gemini_service import GeminiService
+from celery.signals import celeryd_init, worker_init, worker_process_init, worker_process_shutdown
+from app.core.metrics import (
+    QueueDepthCollector, ResponseCacheSizeCollector, mark_process_dead, record_queue_wait,
+    start_metrics_server)
+from app.models.user import SubscriptionTier
+from app.services.gemini_service import get_gemini_service
+from app.tasks.gemini_pipeline import (
+    prepare_message, generate_response, store_response, log_timings)
 from app.config import settings
 
 celery_app = Celery(
     'gemini_tasks',
     broker=settings.redis_url,
-    backend=settings.redis_url
+    backend=settings.redis_url,
+    include=['app.tasks.maintenance_tasks', 'app.tasks.stripe_tasks']
 )
 
+STRIPE_QUEUE = 'stripe'
 
-@celery_app.task
-def process_gemini_message(message_id: int, user_message: str):
-    from app.database import SessionLocal
-    from app.models.message import Message
-    from app.models.chatroom import Chatroom
-    from app.models.user import User
-    from app.models.otp import OTP
-
-    db = SessionLocal()
-    try:
-        gemini_service = GeminiService()
-        response = gemini_service.generate_response(user_message)
-
-        message = db.query(Message).filter(Message.id == message_id).first()
-        if message:
-            message.gemini_response = response
-            db.commit()
-
-        print(
-            f"Message ID: {message_id}, User Message: {user_message}, Response: {response}")
-        return response
-    finally:
-        db.close()
+# Webhook events get their own queue so a Gemini backlog never delays them.
+# Messages go to the PRO or BASIC queue by the sender's tier (see
+# gemini_queue), each consumed by its own workers so BASIC bursts never
+# hold up PRO responses; BASIC is the fallback.
+celery_app.conf.task_routes = {
+    'app.tasks.stripe_tasks.process_stripe_event': {'queue': STRIPE_QUEUE},
+    'app.tasks.gemini_tasks.process_gemini_message': {'queue': settings.gemini_basic_queue},
+}
+# Each worker process reserves only the task it is about to run, so queued
+# messages stay in the broker for whichever worker frees up first
+celery_app.conf.worker_prefetch_multiplier = settings.celery_prefetch_multiplier
+# Task results are never read; tasks that need one can set ignore_result=False
+celery_app.conf.task_ignore_result = settings.celery_ignore_results
+celery_app.conf.result_expires = settings.celery_result_expires_seconds
+celery_app.conf.task_compression = settings.celery_task_compression
+
+celery_app.conf.beat_schedule = {
+    'requeue-stuck-messages': {
+        'task': 'app.tasks.maintenance_tasks.requeue_stuck_messages',
+        'schedule': settings.message_recovery_interval_seconds,
+    },
+}
+if settings.otp_backend == "database":
+    celery_app.conf.beat_schedule['purge-expired-otps'] = {
+        'task': 'app.tasks.maintenance_tasks.purge_expired_otps',
+        'schedule': settings.otp_purge_interval_seconds,
+    }
+
+
+def gemini_queue(tier: Optional[SubscriptionTier]) -> str:
+    if tier == SubscriptionTier.PRO:
+        return settings.gemini_pro_queue
+    return settings.gemini_basic_queue
+
+
+@celeryd_init.connect
+def configure_worker(conf=None, options=None, **kwargs):
+    # A worker consuming only the PRO or only the BASIC queue takes its
+    # concurrency from settings, unless --concurrency is given
+    queues = options.get('queues') or []
+    if options.get('concurrency') or len(queues) != 1:
+        return
+    concurrency = {
+        settings.gemini_pro_queue: settings.gemini_pro_worker_concurrency,
+        settings.gemini_basic_queue: settings.gemini_basic_worker_concurrency,
+    }.get(queues[0])
+    if concurrency:
+        conf.worker_concurrency = concurrency
+
+
+@worker_init.connect
+def init_worker(**kwargs):
+    from app.core.cache import redis_client, response_cache
+
+    # Served from the main worker process. With the prefork pool, set
+    # PROMETHEUS_MULTIPROC_DIR so metrics recorded by the pool processes
+    # are included.
+    if settings.worker_metrics_port:
+        queues = [settings.gemini_pro_queue, settings.gemini_basic_queue,
+                  STRIPE_QUEUE, celery_app.conf.task_default_queue]
+        start_metrics_server(settings.worker_metrics_port,
+                             [QueueDepthCollector(redis_client, queues),
+                              ResponseCacheSizeCollector(response_cache)])
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    from app.database import engine
+
+    # Pooled connections inherited from the parent process must not be
+    # shared with it; open fresh ones in this process instead
+    engine.dispose(close=False)
+    get_gemini_service()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    from app.database import engine
+    from app.tasks.async_executor import shutdown_async_executor
+
+    shutdown_async_executor()
+    engine.dispose()
+    mark_process_dead(os.getpid())
+
+
+@celery_app.task(bind=True)
+def process_gemini_message(self, message_id: int, user_message: Optional[str] = None,
+                           enqueued_at: Optional[float] = None):
+    # The message text is loaded from the database; user_message is only
+    # accepted so tasks queued by older API processes still run
+    record_queue_wait(enqueued_at, (self.request.delivery_info or {}).get('routing_key'))
+    if settings.gemini_execution_mode == "async":
+        from app.tasks.async_executor import get_async_executor
+
+        # Returns once the executor has a free slot; the message is then
+        # processed concurrently with others on the worker's event loop
+        get_async_executor().submit(message_id)
+        return None
+
+    started = time.perf_counter()
+    prepared = prepare_message(message_id)
+    if prepared is None:
+        return None
+    setup_done = time.perf_counter()
+
+    response, chunk_count = generate_response(prepared)
+    generation_done = time.perf_counter()
+
+    store_response(prepared, response, chunk_count)
+    log_timings(message_id, started, setup_done,
+                generation_done, time.perf_counter())
+    return response
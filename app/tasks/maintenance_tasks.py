@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from celery.utils.log import get_task_logger
+from sqlalchemy import exists, select
+from app.tasks.gemini_tasks import celery_app, gemini_queue, process_gemini_message
+from app.config import settings
+from app.core.cache import redis_client
+from app.database import SessionLocal
+from app.models import chatroom, message, user  # noqa: F401
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.models.outbox import OutboxEntry
+from app.models.user import User
+from app.services.otp_service import DatabaseOTPBackend
+from app.services.outbox_service import OutboxService
+from app.services.response_write_service import ResponseWriteService
+
+logger = get_task_logger(__name__)
+
+
+@celery_app.task
+def purge_expired_otps():
+    db = SessionLocal()
+    try:
+        return DatabaseOTPBackend.purge(db)
+    finally:
+        db.close()
+
+
+@celery_app.task
+def requeue_stuck_messages():
+    # Messages sent to Gemini and still without a response
+    # MESSAGE_STUCK_AFTER_SECONDS later (lost task, crashed worker) go back
+    # through the outbox. Imported history is never sent, and a response
+    # waiting in the write-behind stream is not lost, only not yet flushed.
+    # Each is re-queued at most once per MESSAGE_STUCK_AFTER_SECONDS, and
+    # not at all once older than MESSAGE_RECOVERY_MAX_AGE_SECONDS.
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        # Entries left over from an earlier run mean the dispatcher is behind
+        # or down; more entries would only be duplicates
+        backlog = db.scalar(select(exists().where(OutboxEntry.created_at < now - timedelta(
+            seconds=settings.message_recovery_interval_seconds))))
+        if backlog:
+            logger.warning("Outbox not drained, skipping stuck message recovery")
+            return 0
+
+        stuck = db.execute(select(Message.id, User.subscription_tier).join(
+            Chatroom, Message.chatroom_id == Chatroom.id).join(
+            User, Chatroom.user_id == User.id).where(
+            Message.awaiting_response,
+            Message.created_at < now - timedelta(seconds=settings.message_stuck_after_seconds),
+            Message.created_at > now - timedelta(seconds=settings.message_recovery_max_age_seconds)
+        ).order_by(Message.created_at).limit(settings.message_recovery_batch_size)).all()
+        queued = ResponseWriteService.queued(message_id for message_id, _ in stuck)
+        stuck = [row for row in stuck if row.id not in queued]
+        if not stuck:
+            return 0
+
+        pipe = redis_client.pipeline(transaction=False)
+        for message_id, _ in stuck:
+            pipe.set(f"requeued_message:{message_id}", 1, nx=True,
+                     ex=settings.message_stuck_after_seconds)
+        claimed = pipe.execute()
+
+        requeued = 0
+        for (message_id, tier), first in zip(stuck, claimed):
+            if first:
+                OutboxService.add(db, process_gemini_message.name, [message_id],
+                                  {"enqueued_at": now.timestamp()}, gemini_queue(tier))
+                requeued += 1
+        db.commit()
+    finally:
+        db.close()
+
+    if requeued:
+        logger.warning("Re-queued %d stuck message(s)", requeued)
+    return requeued
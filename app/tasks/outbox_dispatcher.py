@@ -0,0 +1,42 @@
+import logging
+import signal
+import threading
+from app.config import settings
+from app.database import SessionLocal
+from app.models import chatroom, message, otp, user  # noqa: F401
+from app.services.outbox_service import OutboxService
+from app.tasks.gemini_tasks import celery_app
+
+# Publishes outbox entries to the broker, so the API never waits on it:
+#   python -m app.tasks.outbox_dispatcher
+# Several can run at once; each claims its own batches.
+
+logger = logging.getLogger(__name__)
+
+
+def run(stop: threading.Event, batch_size: int, poll_interval: float):
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            sent = OutboxService.dispatch(db, celery_app, batch_size)
+        except Exception:
+            logger.exception("Outbox dispatch failed")
+            sent = 0
+        finally:
+            db.close()
+        # A full batch means more entries are waiting
+        if sent < batch_size:
+            stop.wait(poll_interval)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+    logger.info("Outbox dispatcher started, batch size %d", settings.outbox_batch_size)
+    run(stop, settings.outbox_batch_size, settings.outbox_poll_interval_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import logging
+import signal
+import threading
+from app.config import settings
+from app.database import SessionLocal
+from app.models import chatroom, message, otp, user  # noqa: F401
+from app.services.response_write_service import ResponseWriteService
+
+# Applies Gemini responses queued by workers in RESPONSE_WRITE_MODE=stream:
+#   python -m app.tasks.response_flusher
+# Several can run with distinct RESPONSE_FLUSHER_NAMEs; keep the name
+# across restarts so a flusher finds the entries it had not acknowledged.
+
+logger = logging.getLogger(__name__)
+
+
+def flush(entries: list):
+    db = SessionLocal()
+    try:
+        ResponseWriteService.apply(db, entries)
+    finally:
+        db.close()
+    ResponseWriteService.ack(entries)
+
+
+def run(stop: threading.Event, batch_size: int, max_latency_ms: int):
+    ResponseWriteService.ensure_group()
+    # Entries read but never acknowledged (after a crash or a failed batch)
+    # are applied again before new ones
+    retry = True
+    while not stop.is_set():
+        try:
+            entries = ResponseWriteService.read(batch_size, 0, pending=True) if retry else []
+            retry = bool(entries)
+            if not entries:
+                entries = ResponseWriteService.read_batch(batch_size, max_latency_ms)
+            if entries:
+                flush(entries)
+        except Exception:
+            logger.exception("Response flush failed")
+            retry = True
+            stop.wait(1)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+    logger.info("Response flusher %s started, batches of up to %d within %dms",
+                settings.response_flusher_name, settings.response_flush_batch_size,
+                settings.response_flush_max_latency_ms)
+    run(stop, settings.response_flush_batch_size, settings.response_flush_max_latency_ms)
+
+
+if __name__ == "__main__":
+    main()
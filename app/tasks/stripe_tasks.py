@@ -0,0 +1,59 @@
+import json
+from datetime import datetime, timezone
+from celery.utils.log import get_task_logger
+from sqlalchemy import or_, update
+from app.tasks.gemini_tasks import celery_app
+from app.core.auth import user_cache_key
+from app.core.cache import redis_client
+from app.database import SessionLocal
+from app.models import chatroom, message, otp  # noqa: F401
+from app.models.stripe_event import StripeEvent
+from app.models.user import User
+from app.services.stripe_service import StripeService
+
+logger = get_task_logger(__name__)
+
+
+@celery_app.task(autoretry_for=(Exception,), retry_backoff=True, max_retries=5)
+def process_stripe_event(event_id: str):
+    db = SessionLocal()
+    try:
+        # Claiming the event and applying it share one transaction, so a
+        # redelivered or retried task finds it already processed
+        claimed = db.execute(update(StripeEvent).where(
+            StripeEvent.id == event_id,
+            StripeEvent.processed_at.is_(None)
+        ).values(processed_at=datetime.now()).returning(
+            StripeEvent.type, StripeEvent.payload)).first()
+        if claimed is None:
+            return None
+
+        event_type, payload = claimed
+        event = json.loads(payload)
+        data = event["data"]["object"]
+        created_at = datetime.fromtimestamp(event["created"], timezone.utc)
+        tier = StripeService.tier_for_event(event_type, data)
+        mobile_numbers = []
+        if tier is not None and data.get("customer"):
+            # Retries and the queue don't keep Stripe's order: an event older
+            # than the one last applied (say invoice.paid arriving after
+            # customer.subscription.deleted) must not change the tier. Events
+            # from the same second apply in the order they are processed.
+            mobile_numbers = db.execute(update(User).where(
+                User.stripe_customer_id == data["customer"],
+                or_(User.stripe_event_at.is_(None), User.stripe_event_at <= created_at)
+            ).values(subscription_tier=tier, stripe_event_at=created_at).returning(
+                User.mobile_number)).scalars().all()
+        db.commit()
+    finally:
+        db.close()
+
+    # API processes drop their in-process copy within USER_CACHE_LOCAL_TTL_SECONDS
+    for mobile_number in mobile_numbers:
+        try:
+            redis_client.delete(user_cache_key(mobile_number))
+        except Exception:
+            pass
+    logger.info("Stripe event %s (%s) processed, %d user(s) updated",
+                event_id, event_type, len(mobile_numbers))
+    return event_type
@@ -0,0 +1,66 @@
+"""Count database queries per authenticated request.
+
+Runs the app in-process against the configured database and Redis, and
+counts the SQL statements issued per GET /user/me with the user snapshot
+cache disabled and enabled.
+
+    python -m benchmarks.auth_query_count --requests 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from sqlalchemy import event
+
+from app.config import settings
+from app.core.auth import user_snapshots
+from app.database import async_engine
+from app.main import app
+
+queries = 0
+
+
+def count_query(*args):
+    global queries
+    queries += 1
+
+
+async def measure(client: httpx.AsyncClient, headers: dict, total: int, cached: bool):
+    global queries
+    settings.user_cache_enabled = cached
+    user_snapshots.clear()
+
+    queries = 0
+    started = time.perf_counter()
+    for _ in range(total):
+        response = await client.get("/user/me", headers=headers)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - started
+
+    label = "enabled" if cached else "disabled"
+    print(f"user cache {label:8}: {queries / total:.2f} queries/request, "
+          f"{elapsed / total * 1000:.2f} ms/request")
+
+
+async def run(total: int):
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_query)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        mobile_number = f"8{random.randint(100000000, 999999999)}"
+        await client.post("/auth/signup", json={"mobile_number": mobile_number})
+        otp = (await client.post("/auth/send-otp", json={"mobile_number": mobile_number})).json()["otp"]
+        token = (await client.post("/auth/verify-otp", json={"mobile_number": mobile_number, "otp_code": otp})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        await measure(client, headers, total, cached=False)
+        await measure(client, headers, total, cached=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
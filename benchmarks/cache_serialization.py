@@ -0,0 +1,139 @@
+"""Cache serializer micro-benchmark and chatroom cache-hit latency.
+
+Encodes and decodes a chatroom detail payload with each cache serializer,
+with and without compression, then measures GET /chatroom/{id} on a
+cache hit end to end (app in-process, configured database and Redis):
+the cached response body sent as-is vs. a decoded value that FastAPI
+validates and serializes again (the old behaviour, with stdlib json).
+
+    python -m benchmarks.cache_serialization --messages 50 --requests 500
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import timeit
+from datetime import datetime
+
+import httpx
+from fastapi import Depends, HTTPException
+
+import app.core.cache as cache_module
+from app.api.chatroom import get_message_page
+from app.core.auth import create_access_token, get_current_user
+from app.core.cache import cached
+from app.core.serializers import SERIALIZERS, get_codec
+from app.database import SessionLocal, get_db
+from app.main import app
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.models.user import User
+from app.schemas.chatroom import ChatroomDetail, ChatroomResponse
+from sqlalchemy import select
+
+
+def sample_payload(messages: int) -> dict:
+    now = datetime.now().isoformat()
+    return {
+        "id": 1, "name": "Benchmark room", "user_id": 1, "response_cache_bypass": False,
+        "created_at": now, "updated_at": now, "next_before_id": None,
+        "messages": [{
+            "id": i, "chatroom_id": 1, "created_at": now,
+            "user_message": "How do I make my API faster? " * 4,
+            "gemini_response": "Profile first, then cache what is read often. " * 20,
+        } for i in range(messages)],
+    }
+
+
+def run_micro(messages: int, threshold: int):
+    payload = sample_payload(messages)
+    print(f"payload: chatroom detail with {messages} messages")
+    for name in SERIALIZERS:
+        for compress in (None, threshold):
+            codec = get_codec(name, compress)
+            encoded = codec.encode(payload)
+            number = 200
+            encode_us = timeit.timeit(lambda: codec.encode(payload), number=number) / number * 1e6
+            decode_us = timeit.timeit(lambda: codec.decode(encoded), number=number) / number * 1e6
+            label = f"{name}{'+zlib' if compress else ''}"
+            print(f"  {label:13} size={len(encoded):7d}B encode={encode_us:8.1f}us decode={decode_us:8.1f}us")
+
+
+@cached("bench_chatroom", scope=lambda chatroom_id, user_id, db: chatroom_id)
+async def load_decoded_detail(chatroom_id: int, user_id: int, db):
+    chatroom = await db.scalar(select(Chatroom).where(
+        Chatroom.id == chatroom_id, Chatroom.user_id == user_id))
+    page = await get_message_page(db, chatroom.id, None, 50)
+    return ChatroomDetail(
+        **ChatroomResponse.model_validate(chatroom).model_dump(),
+        messages=page.messages,
+        next_before_id=page.next_before_id
+    ).model_dump(mode="json")
+
+
+@app.get("/bench/chatroom/{chatroom_id}", response_model=ChatroomDetail, include_in_schema=False)
+async def decoded_chatroom(chatroom_id: int, current_user: User = Depends(get_current_user),
+                           db=Depends(get_db)):
+    chatroom = await load_decoded_detail(chatroom_id, current_user.id, db)
+    if chatroom is None:
+        raise HTTPException(status_code=404)
+    return chatroom
+
+
+def create_chatroom(messages: int):
+    db = SessionLocal()
+    try:
+        user = User(mobile_number=f"5{random.randint(100000000, 999999999)}")
+        db.add(user)
+        db.flush()
+        chatroom = Chatroom(name="Benchmark room", user_id=user.id)
+        db.add(chatroom)
+        db.flush()
+        db.add_all([Message(
+            chatroom_id=chatroom.id,
+            user_message="How do I make my API faster? " * 4,
+            gemini_response="Profile first, then cache what is read often. " * 20,
+        ) for _ in range(messages)])
+        db.commit()
+        return chatroom.id, create_access_token({"sub": user.mobile_number})
+    finally:
+        db.close()
+
+
+async def measure(client: httpx.AsyncClient, label: str, path: str, token: str, requests: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    await client.get(path, headers=headers)
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    latencies.sort()
+    print(f"  {label:26} p50={statistics.median(latencies):.2f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.2f}ms")
+
+
+async def run_end_to_end(messages: int, requests: int):
+    chatroom_id, token = create_chatroom(messages)
+    configured = cache_module.cache.codec
+    transport = httpx.ASGITransport(app=app)
+    print(f"GET /chatroom/{{id}} cache hits ({requests} requests)")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cache_module.cache.codec = get_codec("json")
+        await measure(client, "decoded + validated (json)", f"/bench/chatroom/{chatroom_id}", token, requests)
+        cache_module.cache.codec = configured
+        await measure(client, "raw body", f"/chatroom/{chatroom_id}", token, requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threshold", type=int, default=1024)
+    parser.add_argument("--micro-only", action="store_true")
+    args = parser.parse_args()
+    run_micro(args.messages, args.threshold)
+    if not args.micro_only:
+        asyncio.run(run_end_to_end(args.messages, args.requests))
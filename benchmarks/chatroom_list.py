@@ -0,0 +1,86 @@
+"""Chatroom list with previews: one query per chatroom vs. denormalized stats.
+
+Seeds one user with --chatrooms chatrooms of --messages messages each in
+the configured database (migrated to 0007, or created with create_all),
+then times loading a page of --limit chatrooms with message counts and
+latest-message previews: the old way (list, then a count and a latest
+message query per chatroom, as the UI's GET /chatroom/{id} calls did) and
+with the page query over the stats kept on chatrooms.
+
+    python -m benchmarks.chatroom_list --chatrooms 500 --messages 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import func, insert, select
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.main import app  # noqa: F401
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.models.user import User
+from app.services.chatroom_service import ChatroomService
+
+
+def seed(chatrooms: int, messages: int) -> int:
+    db = SessionLocal()
+    try:
+        user = User(mobile_number=f"list{time.time_ns()}")
+        db.add(user)
+        db.flush()
+        rooms = [Chatroom(name=f"list {i}", user_id=user.id) for i in range(chatrooms)]
+        db.add_all(rooms)
+        db.flush()
+        for room in rooms:
+            db.execute(insert(Message), [{
+                "chatroom_id": room.id,
+                "user_message": f"question {i} in {room.name}",
+                "gemini_response": f"answer {i} " * 40,
+            } for i in range(messages)])
+            db.execute(ChatroomService.refresh_stats(room.id))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+async def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run(user_id: int, limit: int, repeat: int):
+    async with AsyncSessionLocal() as db:
+        async def per_chatroom():
+            rooms = (await db.scalars(select(Chatroom).where(
+                Chatroom.user_id == user_id).limit(limit))).all()
+            for room in rooms:
+                await db.scalar(select(func.count()).where(Message.chatroom_id == room.id))
+                await db.scalar(select(Message).where(Message.chatroom_id == room.id)
+                                .order_by(Message.id.desc()).limit(1))
+            return rooms
+
+        async def page():
+            return (await db.scalars(ChatroomService.page_query(
+                user_id, "last_activity", None, limit))).all()
+
+        print(f"page of {limit} chatrooms with counts and previews")
+        print(f"  1 + 2 queries per chatroom  {await timed(per_chatroom, repeat):8.1f}ms")
+        print(f"  denormalized page query     {await timed(page, repeat):8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chatrooms", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    user_id = seed(args.chatrooms, args.messages)
+    asyncio.run(run(user_id, args.limit, args.repeat))
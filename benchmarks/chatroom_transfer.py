@@ -0,0 +1,129 @@
+"""Chatroom NDJSON import/export throughput and memory.
+
+Runs the app in-process against the configured database. Imports
+--messages rows into a fresh chatroom through POST /chatroom/{id}/import
+(streamed request body) and compares that with inserting one row per
+statement, then exports them with the GET /chatroom/{id}/export body
+generator and compares that with loading every row at once. Reports
+rows/s and peak Python memory (tracemalloc) for each.
+
+    python -m benchmarks.chatroom_transfer --messages 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+import httpx
+import orjson
+from sqlalchemy import insert, select
+
+from app.core.auth import create_access_token
+from app.database import AsyncSessionLocal, SessionLocal
+from app.main import app
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.models.user import User
+from app.services.transfer_service import TransferService
+
+
+def create_chatrooms(count: int):
+    db = SessionLocal()
+    try:
+        user = User(mobile_number=f"7{random.randint(100000000, 999999999)}")
+        db.add(user)
+        db.flush()
+        chatrooms = [Chatroom(name=f"transfer benchmark {i}", user_id=user.id)
+                     for i in range(count)]
+        db.add_all(chatrooms)
+        db.commit()
+        return [c.id for c in chatrooms], create_access_token({"sub": user.mobile_number})
+    finally:
+        db.close()
+
+
+def make_row(i: int) -> dict:
+    return {"user_message": f"message {i}", "gemini_response": "x" * 400}
+
+
+async def ndjson_body(total: int, chunk_rows: int = 500):
+    for start in range(0, total, chunk_rows):
+        yield b"".join(orjson.dumps(make_row(i)) + b"\n"
+                       for i in range(start, min(start + chunk_rows, total)))
+
+
+def report(label: str, rows: int, elapsed: float, peak: int):
+    print(f"  {label:28} {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s) "
+          f"peak={peak / 1024 / 1024:.1f}MiB")
+
+
+def measured(fn):
+    async def run(*args):
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = await fn(*args)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return rows, elapsed, peak
+    return run
+
+
+@measured
+async def insert_per_row(chatroom_id: int, total: int) -> int:
+    async with AsyncSessionLocal() as db:
+        for i in range(total):
+            await db.execute(insert(Message).values(chatroom_id=chatroom_id, **make_row(i)))
+        await db.commit()
+    return total
+
+
+@measured
+async def import_endpoint(client: httpx.AsyncClient, chatroom_id: int, total: int) -> int:
+    response = await client.post(f"/chatroom/{chatroom_id}/import", content=ndjson_body(total))
+    response.raise_for_status()
+    return response.json()["imported"]
+
+
+@measured
+async def load_all(chatroom_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        messages = (await db.scalars(select(Message).where(
+            Message.chatroom_id == chatroom_id).order_by(Message.id))).all()
+        body = b"".join(orjson.dumps({
+            "id": m.id, "user_message": m.user_message,
+            "gemini_response": m.gemini_response, "created_at": m.created_at,
+        }) + b"\n" for m in messages)
+    return body.count(b"\n")
+
+
+@measured
+async def export_stream(chatroom_id: int) -> int:
+    # The export endpoint's body generator, consumed directly:
+    # httpx.ASGITransport buffers whole responses, which would hide the
+    # difference in memory
+    rows = 0
+    async for chunk in TransferService.export_messages(chatroom_id):
+        rows += chunk.count(b"\n")
+    return rows
+
+
+async def run(total: int):
+    (per_row_id, import_id), token = create_chatrooms(2)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        print("import")
+        report("one INSERT per row", *await insert_per_row(per_row_id, total))
+        report("POST /import (NDJSON)", *await import_endpoint(client, import_id, total))
+        print("export")
+        report("load all rows, then encode", *await load_all(import_id))
+        report("GET /export stream", *await export_stream(import_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages))
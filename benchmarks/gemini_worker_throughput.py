@@ -0,0 +1,80 @@
+"""Messages/sec of one worker process: sync task vs. async executor.
+
+Starts the stub Gemini server in-process, seeds messages in the
+configured database and processes them first one at a time through
+process_gemini_message (what a single prefork process does), then through
+the AsyncGeminiExecutor. Needs the configured database and Redis.
+
+    python -m benchmarks.gemini_worker_throughput --messages 200 --latency 0.5
+"""
+import argparse
+import os
+import time
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--messages", type=int, default=200)
+parser.add_argument("--latency", type=float, default=0.5)
+parser.add_argument("--concurrency", type=int, default=64)
+parser.add_argument("--port", type=int, default=8089)
+args = parser.parse_args()
+
+# Must be set before the Gemini SDK is configured
+os.environ["GEMINI_TRANSPORT"] = "rest"
+os.environ["GEMINI_API_ENDPOINT"] = f"http://127.0.0.1:{args.port}"
+
+from app.database import SessionLocal  # noqa: E402
+from app.models.chatroom import Chatroom  # noqa: E402
+from app.models.message import Message  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.tasks.async_executor import AsyncGeminiExecutor  # noqa: E402
+from app.tasks.gemini_tasks import process_gemini_message  # noqa: E402
+from benchmarks.stub_gemini_server import start_stub_server  # noqa: E402
+
+
+def seed(total: int) -> list:
+    db = SessionLocal()
+    try:
+        user = User(mobile_number=f"worker{time.time_ns()}")
+        db.add(user)
+        db.flush()
+        ids = []
+        for i in range(total):
+            # One chatroom per message keeps the context window empty
+            chatroom = Chatroom(name=f"throughput {i}", user_id=user.id)
+            db.add(chatroom)
+            db.flush()
+            message = Message(chatroom_id=chatroom.id, user_message=f"question {i}")
+            db.add(message)
+            db.flush()
+            ids.append(message.id)
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def report(label: str, total: int, elapsed: float):
+    print(f"{label:15} {total / elapsed:8.1f} messages/sec ({elapsed:.1f}s for {total})")
+
+
+def main():
+    start_stub_server(args.port, args.latency)
+
+    messages = seed(args.messages)
+    started = time.perf_counter()
+    for message_id in messages:
+        process_gemini_message.run(message_id)
+    report("sync task", len(messages), time.perf_counter() - started)
+
+    messages = seed(args.messages)
+    executor = AsyncGeminiExecutor(args.concurrency)
+    started = time.perf_counter()
+    futures = [executor.submit(message_id) for message_id in messages]
+    for future in futures:
+        future.result()
+    report("async executor", len(messages), time.perf_counter() - started)
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
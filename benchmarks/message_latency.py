@@ -0,0 +1,95 @@
+"""Load benchmark for POST /chatroom/{id}/message.
+
+Fires concurrent message sends at a running API and reports latency
+percentiles. Run it against two builds to compare them, e.g.
+
+    python -m benchmarks.message_latency --base-url http://localhost:8000 \
+        --requests 2000 --concurrency 64
+
+The benchmark user is promoted to PRO directly in the database so the
+daily and burst limits do not turn the run into a stream of 429s; leave
+PRO_MESSAGE_BURST_LIMIT unset on the API under test. Rejected requests
+are counted as errors, not timed.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def bootstrap(client: httpx.AsyncClient) -> tuple:
+    mobile_number = f"9{random.randint(100000000, 999999999)}"
+    await client.post("/auth/signup", json={"mobile_number": mobile_number, "password": "benchmark"})
+    otp = (await client.post("/auth/send-otp", json={"mobile_number": mobile_number})).json()["otp"]
+    token = (await client.post("/auth/verify-otp", json={"mobile_number": mobile_number, "otp_code": otp})).json()["access_token"]
+
+    from app.database import SessionLocal
+    from app.models import chatroom, message, otp  # noqa: F401
+    from app.models.user import User, SubscriptionTier
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.mobile_number == mobile_number).update(
+            {"subscription_tier": SubscriptionTier.PRO})
+        db.commit()
+    finally:
+        db.close()
+
+    headers = {"Authorization": f"Bearer {token}"}
+    chatroom = (await client.post("/chatroom/", json={"name": "benchmark"}, headers=headers)).json()
+    return headers, chatroom["id"]
+
+
+async def run(base_url: str, total: int, concurrency: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        headers, chatroom_id = await bootstrap(client)
+
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(i)
+        latencies, errors = [], 0
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                i = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post(
+                    f"/chatroom/{chatroom_id}/message",
+                    json={"user_message": f"benchmark message {i}"},
+                    headers=headers,
+                )
+                if response.status_code == 201:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"requests:    {total} ({errors} errors)")
+    print(f"concurrency: {concurrency}")
+    print(f"throughput:  {total / elapsed:.1f} req/s")
+    if not latencies:
+        raise SystemExit("no request succeeded")
+    print(f"mean:        {statistics.mean(latencies):.1f} ms")
+    for pct in (50, 95, 99):
+        print(f"p{pct}:         {percentile(latencies, pct):.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.requests, args.concurrency))
@@ -0,0 +1,90 @@
+"""Benchmark message history loading on a large chatroom.
+
+Seeds a chatroom with --messages rows (100k by default) and compares
+loading the whole `Chatroom.messages` relationship with keyset page
+queries at the newest and the oldest end of the history.
+
+    python -m benchmarks.message_pagination --messages 100000
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import insert, select
+
+from app.database import SessionLocal
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.models.otp import OTP  # noqa: F401
+from app.models.user import User
+
+
+def seed(db, total: int) -> int:
+    user = User(mobile_number=f"bench{int(time.time())}")
+    db.add(user)
+    db.flush()
+    chatroom = Chatroom(name="pagination benchmark", user_id=user.id)
+    db.add(chatroom)
+    db.flush()
+
+    batch = 5000
+    for start in range(0, total, batch):
+        db.execute(insert(Message), [
+            {
+                "chatroom_id": chatroom.id,
+                "user_message": f"message {i}",
+                "gemini_response": "x" * 400,
+            }
+            for i in range(start, min(start + batch, total))
+        ])
+    db.commit()
+    return chatroom.id
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def page(db, chatroom_id: int, before_id, limit: int):
+    query = select(Message).where(Message.chatroom_id == chatroom_id)
+    if before_id is not None:
+        query = query.where(Message.id < before_id)
+    rows = db.scalars(query.order_by(Message.id.desc()).limit(limit + 1)).all()
+    db.expunge_all()
+    return rows
+
+
+def full_load(db, chatroom_id: int):
+    chatroom = db.get(Chatroom, chatroom_id)
+    rows = list(chatroom.messages)
+    db.expunge_all()
+    return rows
+
+
+def main(total: int, limit: int, repeat: int):
+    db = SessionLocal()
+    try:
+        chatroom_id = seed(db, total)
+        oldest_id = db.scalar(select(Message.id).where(
+            Message.chatroom_id == chatroom_id).order_by(Message.id).offset(limit))
+
+        print(f"chatroom {chatroom_id} with {total} messages, page size {limit}")
+        print(f"full relationship load: {timed(lambda: full_load(db, chatroom_id), repeat):9.2f} ms")
+        print(f"latest page:            {timed(lambda: page(db, chatroom_id, None, limit), repeat):9.2f} ms")
+        print(f"oldest page:            {timed(lambda: page(db, chatroom_id, oldest_id, limit), repeat):9.2f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.messages, args.limit, args.repeat)
@@ -0,0 +1,99 @@
+"""Message search latency: full-text index vs. a LIKE scan.
+
+Seeds --messages rows spread over --users users (--chatrooms each) in the
+configured database (migrated to 0006, or created with create_all), then
+times SearchService.search for one user against the same query as
+case-insensitive LIKE filters over user_message and gemini_response.
+
+    python -m benchmarks.message_search --messages 200000 --users 50
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import time
+
+from sqlalchemy import insert, or_, select
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.main import app  # noqa: F401
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.models.user import User
+from app.services.search_service import SearchService
+
+# A Zipf-like vocabulary: a few common words and a long tail of rare ones
+random.seed(7)
+WORDS = ["".join(random.choices("abcdefghijklmnopqrstuvwxyz", k=random.randint(3, 9)))
+         for _ in range(20000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(WORDS))))
+
+
+def sentence(length: int) -> str:
+    return " ".join(random.choices(WORDS, cum_weights=CUM_WEIGHTS, k=length))
+
+
+def seed(total: int, users: int, chatrooms: int) -> int:
+    db = SessionLocal()
+    try:
+        stamp = time.time_ns()
+        owners = [User(mobile_number=f"search{stamp}{i}") for i in range(users)]
+        db.add_all(owners)
+        db.flush()
+        rooms = [Chatroom(name=f"search {i}", user_id=owner.id)
+                 for owner in owners for i in range(chatrooms)]
+        db.add_all(rooms)
+        db.flush()
+        batch = 5000
+        for start in range(0, total, batch):
+            db.execute(insert(Message), [{
+                "chatroom_id": random.choice(rooms).id,
+                "user_message": sentence(8),
+                "gemini_response": sentence(60),
+            } for _ in range(start, min(start + batch, total))])
+        db.commit()
+        return owners[0].id
+    finally:
+        db.close()
+
+
+async def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run(user_id: int, query: str, limit: int, repeat: int):
+    async with AsyncSessionLocal() as db:
+        async def indexed():
+            return await SearchService.search(db, user_id, query, limit, 0)
+
+        async def like_scan():
+            user_chatrooms = select(Chatroom.id).where(Chatroom.user_id == user_id)
+            filters = [or_(Message.user_message.ilike(f"%{word}%"),
+                           Message.gemini_response.ilike(f"%{word}%"))
+                       for word in query.split()]
+            return (await db.scalars(select(Message).where(
+                Message.chatroom_id.in_(user_chatrooms), *filters
+            ).order_by(Message.id.desc()).limit(limit))).all()
+
+        print(f"query {query!r}, first {limit} results for one user")
+        print(f"  full-text search  {await timed(indexed, repeat):8.1f}ms (ranked)")
+        print(f"  LIKE scan         {await timed(like_scan, repeat):8.1f}ms (unranked)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--chatrooms", type=int, default=10)
+    parser.add_argument("--query", help="defaults to two mid-frequency words")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    user_id = seed(args.messages, args.users, args.chatrooms)
+    asyncio.run(run(user_id, args.query or f"{WORDS[50]} {WORDS[200]}", args.limit, args.repeat))
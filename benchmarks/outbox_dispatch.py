@@ -0,0 +1,101 @@
+"""Message write latency with a slow broker: publish in the request vs. outbox.
+
+Writes --messages messages to one chatroom in the configured database,
+first committing each and then publishing its task (as send_message did),
+then committing each together with its outbox entry. --broker-delay adds
+that many seconds to every publish, via Celery's before_task_publish
+signal, to stand in for a slow or distant broker. Then drains the outbox
+with the dispatcher's batches and reports entries published per second.
+Uses the in-memory broker unless --broker is given.
+
+    python -m benchmarks.outbox_dispatch --messages 500 --broker-delay 0.05
+"""
+import argparse
+import statistics
+import time
+
+from celery.signals import before_task_publish
+
+from app.database import SessionLocal
+from app.main import app  # noqa: F401
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.models.user import User
+from app.services.outbox_service import OutboxService
+from app.tasks.gemini_tasks import celery_app, process_gemini_message
+
+broker_delay = 0.0
+
+
+@before_task_publish.connect
+def slow_broker(**kwargs):
+    time.sleep(broker_delay)
+
+
+def seed_chatroom(db) -> int:
+    user = User(mobile_number=f"outbox{time.time_ns()}")
+    db.add(user)
+    db.flush()
+    chatroom = Chatroom(name="outbox", user_id=user.id)
+    db.add(chatroom)
+    db.commit()
+    return chatroom.id
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    return (f"p50={statistics.median(samples) * 1000:7.1f}ms "
+            f"p99={samples[max(0, int(len(samples) * 0.99) - 1)] * 1000:7.1f}ms")
+
+
+def write_messages(db, chatroom_id: int, total: int, outbox: bool) -> list:
+    samples = []
+    for i in range(total):
+        started = time.perf_counter()
+        message = Message(chatroom_id=chatroom_id, user_message=f"question {i}")
+        db.add(message)
+        db.flush()
+        kwargs = {"enqueued_at": time.time()}
+        if outbox:
+            OutboxService.add(db, process_gemini_message.name, [message.id], kwargs, "outbox_benchmark")
+            db.commit()
+        else:
+            db.commit()
+            process_gemini_message.apply_async([message.id], kwargs, queue="outbox_benchmark")
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    global broker_delay
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--broker-delay", type=float, default=0.05)
+    parser.add_argument("--broker", default="memory://")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    celery_app.conf.broker_url = args.broker
+    broker_delay = args.broker_delay
+
+    db = SessionLocal()
+    try:
+        chatroom_id = seed_chatroom(db)
+        print(f"{args.messages} messages, {args.broker_delay * 1000:.0f}ms per publish")
+        print(f"  publish after commit  {percentiles(write_messages(db, chatroom_id, args.messages, False))}")
+        print(f"  outbox entry          {percentiles(write_messages(db, chatroom_id, args.messages, True))}")
+
+        started, sent = time.perf_counter(), 0
+        while True:
+            batch = OutboxService.dispatch(db, celery_app, args.batch_size)
+            sent += batch
+            if batch < args.batch_size:
+                break
+        elapsed = time.perf_counter() - started
+        print(f"  dispatcher            {sent} entries in {elapsed:.2f}s ({sent / elapsed:.0f}/s, "
+              f"batches of {args.batch_size})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Concurrency check for the Redis rate limiter.
+
+Fires many simultaneous RateLimiter.consume calls for one BASIC user
+against the configured Redis, at most --concurrency at a time (default
+REDIS_MAX_CONNECTIONS), and verifies that exactly the daily quota is
+granted. Calls refused because the Redis pool was busy are counted
+apart; any of them, or an overshot quota, exits non-zero.
+
+    python -m benchmarks.rate_limit_concurrency --requests 500
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.cache import pool_exhausted
+from app.core.rate_limiter import RateLimiter
+from app.models import chatroom, message, otp  # noqa: F401
+from app.models.user import User, SubscriptionTier
+
+
+async def run(total: int, concurrency: int) -> bool:
+    # Isolate the daily quota from the burst limit
+    settings.message_burst_limit = None
+    user = User(id=random.randint(10**8, 10**9),
+                subscription_tier=SubscriptionTier.BASIC)
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def attempt():
+        async with slots:
+            try:
+                await RateLimiter.consume(user)
+                return "granted"
+            except HTTPException:
+                return "denied"
+            except Exception as e:
+                if pool_exhausted(e):
+                    return "busy"
+                raise
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(attempt() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    granted = results.count("granted")
+    busy = results.count("busy")
+    quota = settings.basic_daily_message_limit
+    print(f"attempts: {total} in {elapsed * 1000:.1f} ms ({concurrency} concurrent)")
+    print(f"granted:  {granted} (quota {quota})")
+    print(f"busy:     {busy} (Redis pool exhausted)")
+    print(f"counter:  {await RateLimiter.get_message_count(user)}")
+    return granted == quota and not busy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=settings.redis_max_connections)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.requests, args.concurrency))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,99 @@
+"""Gemini response writes/s: one commit per task vs. the write-behind flusher.
+
+Seeds --messages messages over --chatrooms chatrooms in the configured
+database, then has --workers threads store a response for each through
+the worker's store_response: first with RESPONSE_WRITE_MODE=direct (an
+UPDATE and a commit per message), then with stream, where workers
+append to the Redis stream and app.tasks.response_flusher runs alongside
+until every response is in the database. Needs the configured database
+and Redis.
+
+    python -m benchmarks.response_write_throughput --messages 5000 --workers 16
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, insert, select
+
+from app.config import settings
+from app.database import SessionLocal
+from app.main import app  # noqa: F401
+from app.models.chatroom import Chatroom
+from app.models.message import Message
+from app.models.user import User
+from app.services.response_write_service import ResponseWriteService
+from app.tasks import response_flusher
+from app.tasks.gemini_pipeline import PreparedMessage, store_response
+
+RESPONSE = "Profile first, then cache what is read often and batch what is written often. " * 10
+
+
+def seed(total: int, chatrooms: int) -> list:
+    db = SessionLocal()
+    try:
+        user = User(mobile_number=f"writes{time.time_ns()}")
+        db.add(user)
+        db.flush()
+        rooms = [Chatroom(name=f"writes {i}", user_id=user.id) for i in range(chatrooms)]
+        db.add_all(rooms)
+        db.flush()
+        rows = [{"chatroom_id": rooms[i % chatrooms].id, "user_message": f"question {i}"}
+                for i in range(total)]
+        ids = db.execute(insert(Message).returning(Message.id, Message.chatroom_id), rows).all()
+        db.commit()
+        return [PreparedMessage(message_id, chatroom_id, user.id, "question", [])
+                for message_id, chatroom_id in ids]
+    finally:
+        db.close()
+
+
+def pending(prepared: list) -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).where(
+            Message.id.in_([p.message_id for p in prepared]), Message.gemini_response.is_(None)))
+    finally:
+        db.close()
+
+
+def run(mode: str, prepared: list, workers: int) -> float:
+    settings.response_write_mode = mode
+    stop = threading.Event()
+    flusher = None
+    if mode == "stream":
+        flusher = threading.Thread(target=response_flusher.run, args=(
+            stop, settings.response_flush_batch_size, settings.response_flush_max_latency_ms))
+        flusher.start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(lambda p: store_response(p, RESPONSE, 1), prepared))
+    while pending(prepared):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    if flusher:
+        flusher.join()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--chatrooms", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    ResponseWriteService.ensure_group()
+    print(f"{args.messages} responses from {args.workers} workers")
+    for mode, label in (("direct", "commit per task"),
+                        ("stream", f"write-behind, batches of {settings.response_flush_batch_size}")):
+        elapsed = run(mode, seed(args.messages, args.chatrooms), args.workers)
+        print(f"  {label:32} {elapsed:6.2f}s ({args.messages / elapsed:7.0f} responses/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Latency of an unrelated endpoint during a burst of signups.
+
+Runs the app in-process against the configured database, fires a burst
+of concurrent POST /auth/signup requests and meanwhile polls GET /health,
+once with bcrypt hashing inline on the event loop (the old behaviour) and
+once on the password hashing pool.
+
+    python -m benchmarks.signup_burst --signups 50
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+import app.api.auth as auth_api
+from app.core.auth import get_password_hash, hash_password
+from app.main import app
+
+
+async def inline_hash_password(password: str) -> str:
+    return get_password_hash(password)
+
+
+async def measure(label: str, signups: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        burst_done = asyncio.Event()
+        latencies = []
+
+        async def poll_health():
+            # Latency is measured from when each poll was due, so time spent
+            # waiting for a blocked event loop is included
+            interval = 0.005
+            due = time.perf_counter()
+            while not burst_done.is_set():
+                await asyncio.sleep(max(0, due - time.perf_counter()))
+                await client.get("/health")
+                latencies.append((time.perf_counter() - due) * 1000)
+                due = max(due + interval, time.perf_counter())
+
+        async def signup():
+            mobile_number = f"7{random.randint(100000000, 999999999)}"
+            await client.post("/auth/signup", json={"mobile_number": mobile_number, "password": "benchmark"})
+
+        poller = asyncio.create_task(poll_health())
+        started = time.perf_counter()
+        await asyncio.gather(*(signup() for _ in range(signups)))
+        elapsed = time.perf_counter() - started
+        burst_done.set()
+        await poller
+
+    latencies.sort()
+    print(f"{label:14} burst {elapsed:.2f}s | /health n={len(latencies)} "
+          f"p50={statistics.median(latencies):.1f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f}ms "
+          f"max={latencies[-1]:.1f}ms")
+
+
+async def run(signups: int):
+    auth_api.hash_password = inline_hash_password
+    await measure("inline bcrypt", signups)
+    auth_api.hash_password = hash_password
+    await measure("hashing pool", signups)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--signups", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.signups))
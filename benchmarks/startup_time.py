@@ -0,0 +1,76 @@
+"""API import time and cold start time to the first response.
+
+Each run is a fresh Python process using the configured environment:
+importing app.main, then starting uvicorn and polling GET /health until
+it answers (lifespan warm-up included). Pass --app-dir to measure
+another checkout, e.g. an older commit from `git worktree add`.
+--importtime lists the slowest modules imported by app.main.
+
+    python -m benchmarks.startup_time --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+IMPORT_SCRIPT = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def import_time(app_dir: str) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=app_dir,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def cold_start(app_dir: str, port: int, timeout: float = 60) -> float:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("server did not answer /health")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def slowest_imports(app_dir: str, count: int):
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            cwd=app_dir, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            rows.append((int(cumulative), name.rstrip()))
+    # Only top-level imports of app modules and their direct dependencies
+    top = [row for row in rows if not row[1].startswith("      ")]
+    for cumulative, name in sorted(top, reverse=True)[:count]:
+        print(f"  {cumulative / 1000:8.1f}ms {name}")
+
+
+def summary(samples: list) -> str:
+    return f"median={statistics.median(samples) * 1000:.0f}ms min={min(samples) * 1000:.0f}ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--app-dir", default=os.getcwd())
+    parser.add_argument("--importtime", type=int, default=0, metavar="N")
+    args = parser.parse_args()
+
+    print(f"import app.main: {summary([import_time(args.app_dir) for _ in range(args.runs)])}")
+    print(f"first response:  {summary([cold_start(args.app_dir, args.port) for _ in range(args.runs)])}")
+    if args.importtime:
+        print("slowest imports:")
+        slowest_imports(args.app_dir, args.importtime)
@@ -0,0 +1,99 @@
+"""Fake Stripe event generator for the webhook endpoint.
+
+Builds Stripe-style events for one customer, signs them with
+STRIPE_WEBHOOK_SECRET the way Stripe does and posts each one several times
+to POST /webhook/stripe (as Stripe does on retries), reporting the webhook
+latency and response statuses. With --print, outputs a single signed event
+and its Stripe-Signature header instead.
+
+    python -m benchmarks.stripe_webhook --customer cus_123 --deliveries 3
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import statistics
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+EVENT_OBJECTS = {
+    "checkout.session.completed": lambda customer: {
+        "object": "checkout.session", "customer": customer, "mode": "subscription"},
+    "invoice.paid": lambda customer: {
+        "object": "invoice", "customer": customer, "status": "paid"},
+    "customer.subscription.updated": lambda customer: {
+        "object": "subscription", "customer": customer, "status": "active"},
+    "customer.subscription.deleted": lambda customer: {
+        "object": "subscription", "customer": customer, "status": "canceled"},
+}
+
+
+def make_event(event_type: str, customer: str, status: Optional[str] = None) -> dict:
+    data = EVENT_OBJECTS[event_type](customer)
+    data["id"] = f"{data['object'][:3]}_{uuid.uuid4().hex[:14]}"
+    if status:
+        data["status"] = status
+    return {
+        "id": f"evt_{uuid.uuid4().hex[:24]}",
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "livemode": False,
+        "data": {"object": data},
+    }
+
+
+def sign_payload(payload: str, secret: str, timestamp: Optional[int] = None) -> str:
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(),
+                         hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+async def run(url: str, customer: str, deliveries: int):
+    events = [make_event(event_type, customer) for event_type in EVENT_OBJECTS]
+    latencies = []
+    statuses = Counter()
+
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        for event in events:
+            payload = json.dumps(event)
+            for _ in range(deliveries):
+                started = time.perf_counter()
+                response = await client.post(
+                    "/webhook/stripe", content=payload,
+                    headers={"Stripe-Signature": sign_payload(payload, settings.stripe_webhook_secret),
+                             "Content-Type": "application/json"})
+                latencies.append((time.perf_counter() - started) * 1000)
+                body = response.json()
+                statuses[f"{response.status_code} {body.get('status', body.get('detail'))}"] += 1
+
+    latencies.sort()
+    print(f"events: {len(events)} x {deliveries} deliveries")
+    print(f"p50: {statistics.median(latencies):.1f} ms  "
+          f"p99: {latencies[int(len(latencies) * 0.99) - 1]:.1f} ms")
+    for status, count in sorted(statuses.items()):
+        print(f"{status}: {count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--customer", default="cus_fake")
+    parser.add_argument("--deliveries", type=int, default=3)
+    parser.add_argument("--print", dest="print_event", choices=sorted(EVENT_OBJECTS))
+    args = parser.parse_args()
+
+    if args.print_event:
+        payload = json.dumps(make_event(args.print_event, args.customer))
+        print(payload)
+        print(f"Stripe-Signature: {sign_payload(payload, settings.stripe_webhook_secret)}")
+    else:
+        asyncio.run(run(args.url, args.customer, args.deliveries))
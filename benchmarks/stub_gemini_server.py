@@ -0,0 +1,69 @@
+"""Local stand-in for the Gemini REST API.
+
+Answers generateContent/streamGenerateContent after a fixed latency so
+worker throughput can be measured without calling the real model. Point
+the app at it with GEMINI_TRANSPORT=rest and
+GEMINI_API_ENDPOINT=http://127.0.0.1:8089.
+
+    python -m benchmarks.stub_gemini_server --port 8089 --latency 0.5
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_response(text: str) -> dict:
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": 1,
+            "index": 0,
+        }]
+    }
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+    chunks = ["This is ", "a stubbed ", "Gemini response."]
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+
+        if ":streamGenerateContent" in self.path:
+            body = [make_response(chunk) for chunk in self.chunks]
+        elif ":generateContent" in self.path:
+            body = make_response("".join(self.chunks))
+        else:
+            self.send_error(404)
+            return
+
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int, latency: float) -> ThreadingHTTPServer:
+    StubGeminiHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubGeminiHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    start_stub_server(args.port, args.latency)
+    print(f"Stub Gemini API on http://127.0.0.1:{args.port} ({args.latency}s latency)")
+    threading.Event().wait()
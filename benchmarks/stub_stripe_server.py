@@ -0,0 +1,88 @@
+"""Local stand-in for the Stripe API.
+
+Answers the customer, price and checkout session calls made by
+subscribe_pro after a fixed latency, and counts requests per endpoint.
+Point the app at it with STRIPE_API_BASE=http://127.0.0.1:12111.
+
+    python -m benchmarks.stub_stripe_server --port 12111 --latency 0.3
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.3
+    prices = {}
+    requests = Counter()
+    lock = threading.Lock()
+
+    def respond(self, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with self.lock:
+            self.requests[f"GET {url.path}"] += 1
+        time.sleep(self.latency)
+
+        if url.path == "/v1/prices":
+            lookup_keys = parse_qs(url.query).get("lookup_keys[0]", [])
+            data = [self.prices[key] for key in lookup_keys if key in self.prices]
+            self.respond({"object": "list", "data": data, "has_more": False, "url": "/v1/prices"})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+        with self.lock:
+            self.requests[f"POST {url.path}"] += 1
+        time.sleep(self.latency)
+
+        if url.path == "/v1/customers":
+            self.respond({"id": f"cus_{uuid.uuid4().hex[:14]}", "object": "customer"})
+        elif url.path == "/v1/prices":
+            price = {"id": f"price_{uuid.uuid4().hex[:14]}", "object": "price",
+                     "lookup_key": form.get("lookup_key", [None])[0], "active": True}
+            with self.lock:
+                self.prices[price["lookup_key"]] = price
+            self.respond(price)
+        elif url.path == "/v1/checkout/sessions":
+            session_id = f"cs_test_{uuid.uuid4().hex}"
+            self.respond({"id": session_id, "object": "checkout.session",
+                          "url": f"https://checkout.stripe.test/{session_id}"})
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int, latency: float) -> ThreadingHTTPServer:
+    StubStripeHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubStripeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+    start_stub_server(args.port, args.latency)
+    print(f"Stub Stripe API on http://127.0.0.1:{args.port} ({args.latency}s latency)")
+    threading.Event().wait()
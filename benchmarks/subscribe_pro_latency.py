@@ -0,0 +1,107 @@
+"""Event loop responsiveness during concurrent POST /subscribe/pro calls.
+
+Runs the app in-process against the configured database and a local
+Stripe stub (benchmarks.stub_stripe_server), fires concurrent Pro
+subscriptions for fresh users and meanwhile polls GET /health, once with
+the Stripe SDK called inline on the event loop (the old behaviour) and
+once on the Stripe thread pool. Also reports the calls the stub received.
+
+    python -m benchmarks.subscribe_pro_latency --users 20 --latency 0.3
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+import stripe
+
+from app.core.auth import create_access_token
+from app.database import SessionLocal
+from app.main import app
+from app.models.user import User
+from app.services.stripe_service import StripeService
+from benchmarks.stub_stripe_server import StubStripeHandler, start_stub_server
+
+
+async def inline_create_customer(email: str, name: str = None):
+    return StripeService.create_customer(email, name)
+
+
+async def inline_create_checkout_session(customer_email: str = None, customer_id: str = None):
+    return StripeService.create_checkout_session(customer_email, customer_id)
+
+
+def create_users(count: int) -> list:
+    db = SessionLocal()
+    try:
+        users = [User(mobile_number=f"6{random.randint(100000000, 999999999)}")
+                 for _ in range(count)]
+        db.add_all(users)
+        db.commit()
+        return [create_access_token({"sub": user.mobile_number}) for user in users]
+    finally:
+        db.close()
+
+
+async def measure(label: str, users: int):
+    tokens = create_users(users)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        burst_done = asyncio.Event()
+        latencies = []
+
+        async def poll_health():
+            # Measured from when each poll was due, so time spent waiting
+            # for a blocked event loop is included
+            interval = 0.005
+            due = time.perf_counter()
+            while not burst_done.is_set():
+                await asyncio.sleep(max(0, due - time.perf_counter()))
+                await client.get("/health")
+                latencies.append((time.perf_counter() - due) * 1000)
+                due = max(due + interval, time.perf_counter())
+
+        async def subscribe(token: str):
+            response = await client.post(
+                "/subscribe/pro", headers={"Authorization": f"Bearer {token}"})
+            return response.status_code
+
+        poller = asyncio.create_task(poll_health())
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(subscribe(token) for token in tokens))
+        elapsed = time.perf_counter() - started
+        burst_done.set()
+        await poller
+
+    latencies.sort()
+    print(f"{label:12} {users} subscriptions in {elapsed:.2f}s "
+          f"({statuses.count(200)} ok) | /health n={len(latencies)} "
+          f"p50={statistics.median(latencies):.1f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f}ms "
+          f"max={latencies[-1]:.1f}ms")
+
+
+async def run(users: int):
+    pooled = (StripeService.create_customer_async,
+              StripeService.create_checkout_session_async)
+    StripeService.create_customer_async = inline_create_customer
+    StripeService.create_checkout_session_async = inline_create_checkout_session
+    await measure("inline", users)
+    StripeService.create_customer_async, StripeService.create_checkout_session_async = pooled
+    await measure("thread pool", users)
+
+    print("stub calls:", ", ".join(
+        f"{endpoint}={count}" for endpoint, count in sorted(StubStripeHandler.requests.items())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+    start_stub_server(args.port, args.latency)
+    stripe.api_base = f"http://127.0.0.1:{args.port}"
+    asyncio.run(run(args.users))
@@ -0,0 +1,75 @@
+"""Redis memory used by queued Gemini tasks: full payloads vs. message ids.
+
+Publishes --messages process_gemini_message tasks to an unconsumed
+scratch queue on --redis-url, once the old way (message text in the
+payload, plus the response stored in the result backend as a finished
+task would) and once as sent now (message id only, results ignored,
+optionally compressed). Reports the bytes stored and the change in Redis
+used_memory for each, then deletes the keys it wrote. Use a Redis
+database nothing else writes to.
+
+    python -m benchmarks.task_payload_memory --messages 10000 --redis-url redis://localhost:6379/15
+"""
+import argparse
+import time
+import uuid
+
+import redis
+from celery import Celery
+
+from app.tasks.gemini_tasks import process_gemini_message
+
+QUEUE = "payload_benchmark"
+USER_MESSAGE = "How do I make my API faster? Here is what my service does today. " * 6
+RESPONSE = "Profile first, then cache what is read often and batch what is written often. " * 40
+
+
+def used_memory(client: redis.Redis) -> int:
+    return client.info("memory")["used_memory"]
+
+
+def stored_bytes(client: redis.Redis, result_keys: list) -> int:
+    queued = sum(len(entry) for entry in client.lrange(QUEUE, 0, -1))
+    pipe = client.pipeline(transaction=False)
+    for key in result_keys:
+        pipe.strlen(key)
+    return queued + sum(pipe.execute())
+
+
+def measure(label: str, client: redis.Redis, app: Celery, total: int,
+            full_payload: bool, compression: str = None):
+    client.delete(QUEUE)
+    before = used_memory(client)
+    result_keys = []
+    for message_id in range(total):
+        args = (message_id, USER_MESSAGE) if full_payload else (message_id,)
+        task_id = str(uuid.uuid4())
+        app.send_task(process_gemini_message.name, args, {"enqueued_at": time.time()},
+                      queue=QUEUE, task_id=task_id, compression=compression)
+        if full_payload:
+            app.backend.store_result(task_id, RESPONSE, "SUCCESS")
+            result_keys.append(app.backend.get_key_for_task(task_id))
+    stored = stored_bytes(client, result_keys)
+    grown = used_memory(client) - before
+    print(f"  {label:28} stored={stored / 1024 / 1024:7.2f}MiB ({stored / total:6.0f}B/message) "
+          f"used_memory +{grown / 1024 / 1024:.2f}MiB")
+    client.delete(QUEUE, *result_keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.redis_url)
+    app = Celery("payload_benchmark", broker=args.redis_url, backend=args.redis_url)
+    print(f"{args.messages} queued messages")
+    measure("text payload + stored result", client, app, args.messages, full_payload=True)
+    measure("message id only", client, app, args.messages, full_payload=False)
+    measure("message id only, zlib", client, app, args.messages,
+            full_payload=False, compression="zlib")
+
+
+if __name__ == "__main__":
+    main()
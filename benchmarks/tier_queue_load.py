@@ -0,0 +1,144 @@
+"""PRO message latency under a BASIC burst: one shared queue vs. tier queues.
+
+Starts the stub Gemini server and embedded Celery workers in-process (the
+in-memory broker by default, or --broker redis://...), seeds messages in
+the configured database, enqueues a burst of BASIC messages and then
+trickles in PRO messages. First everything goes to one queue served by
+one worker (the old behaviour), then each tier goes to its own queue
+with its own worker, sized by GEMINI_PRO/BASIC_WORKER_CONCURRENCY.
+Reports queue wait and end-to-end latency per tier. Needs the configured
+database and Redis.
+
+    python -m benchmarks.tier_queue_load --basic 200 --pro 20 --latency 0.3
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from contextlib import ExitStack
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--basic", type=int, default=200)
+parser.add_argument("--pro", type=int, default=20)
+parser.add_argument("--pro-interval", type=float, default=0.1)
+parser.add_argument("--latency", type=float, default=0.3)
+parser.add_argument("--broker", default="memory://")
+parser.add_argument("--port", type=int, default=8089)
+args = parser.parse_args()
+
+# Must be set before the Gemini SDK is configured
+os.environ["GEMINI_TRANSPORT"] = "rest"
+os.environ["GEMINI_API_ENDPOINT"] = f"http://127.0.0.1:{args.port}"
+
+from celery.contrib.testing.worker import start_worker  # noqa: E402
+from celery.signals import task_postrun, task_prerun  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.chatroom import Chatroom  # noqa: E402
+from app.models.message import Message  # noqa: E402
+from app.models.user import SubscriptionTier, User  # noqa: E402
+from app.tasks.gemini_tasks import celery_app, gemini_queue, process_gemini_message  # noqa: E402
+from benchmarks.stub_gemini_server import start_stub_server  # noqa: E402
+
+enqueued = {}
+started = {}
+finished = {}
+lock = threading.Lock()
+
+
+@task_prerun.connect
+def on_prerun(args=None, **kwargs):
+    with lock:
+        started[args[0]] = time.perf_counter()
+
+
+@task_postrun.connect
+def on_postrun(args=None, **kwargs):
+    with lock:
+        finished[args[0]] = time.perf_counter()
+
+
+def seed(total: int) -> list:
+    db = SessionLocal()
+    try:
+        user = User(mobile_number=f"tier{time.time_ns()}")
+        db.add(user)
+        db.flush()
+        ids = []
+        for i in range(total):
+            # One chatroom per message keeps the context window empty
+            chatroom = Chatroom(name=f"tier load {i}", user_id=user.id)
+            db.add(chatroom)
+            db.flush()
+            message = Message(chatroom_id=chatroom.id, user_message=f"question {i}")
+            db.add(message)
+            db.flush()
+            ids.append(message.id)
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def enqueue(messages: list, queue: str):
+    for message_id in messages:
+        enqueued[message_id] = time.perf_counter()
+        process_gemini_message.apply_async(
+            (message_id,), {"enqueued_at": time.time()}, queue=queue)
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    return (f"p50={statistics.median(samples) * 1000:7.0f}ms "
+            f"p99={samples[max(0, int(len(samples) * 0.99) - 1)] * 1000:7.0f}ms")
+
+
+def report(tier: str, messages: list):
+    waits = [started[i] - enqueued[i] for i in messages]
+    totals = [finished[i] - enqueued[i] for i in messages]
+    print(f"  {tier:5} wait {percentiles(waits)} | end to end {percentiles(totals)}")
+
+
+def run(label: str, workers: list, queue_for: dict):
+    basic, pro = seed(args.basic), seed(args.pro)
+    print(f"{label}: " + ", ".join(
+        f"{'+'.join(queues)} x{concurrency}" for queues, concurrency in workers))
+    with ExitStack() as stack:
+        for queues, concurrency in workers:
+            stack.enter_context(start_worker(
+                celery_app, pool="threads", concurrency=concurrency, queues=queues,
+                perform_ping_check=False, loglevel="WARNING", shutdown_timeout=60))
+        enqueue(basic, queue_for[SubscriptionTier.BASIC])
+        for message in pro:
+            enqueue([message], queue_for[SubscriptionTier.PRO])
+            time.sleep(args.pro_interval)
+        while not all(i in finished for i in basic + pro):
+            time.sleep(0.05)
+    report("PRO", pro)
+    report("BASIC", basic)
+
+
+def main():
+    start_stub_server(args.port, args.latency)
+    # Several embedded workers share this process and its metrics
+    settings.worker_metrics_port = None
+    celery_app.conf.update(
+        broker_url=args.broker,
+        task_ignore_result=True,
+        worker_hijack_root_logger=False,
+        broker_transport_options={"polling_interval": 0.01},
+    )
+    pro_queue, basic_queue = settings.gemini_pro_queue, settings.gemini_basic_queue
+    total = settings.gemini_pro_worker_concurrency + settings.gemini_basic_worker_concurrency
+
+    run("one shared queue", [([basic_queue], total)],
+        {tier: basic_queue for tier in SubscriptionTier})
+    run("tier queues", [([pro_queue], settings.gemini_pro_worker_concurrency),
+                        ([basic_queue], settings.gemini_basic_worker_concurrency)],
+        {tier: gemini_queue(tier) for tier in SubscriptionTier})
+
+
+if __name__ == "__main__":
+    main()